@@ -1,11 +1,38 @@
+import time
+START_TIME = time.perf_counter()  # Mesure du démarrage (--startup-report)
+
 import os
-import re
-import fitz  # PyMuPDF
-import pandas as pd
+import sys
+import bisect
 import customtkinter as ctk
+import tkinter as tk
 from tkinter import filedialog, messagebox
-from PIL import Image
-import threading
+from PIL import Image, ImageTk
+import multiprocessing
+# Fonctions de traitement toujours importables depuis App (scripts existants)
+from processing import extract_circuit_numbers, match_with_excel, match_with_wire_list, add_annotations_to_pdf, process_pdf_streaming
+from processing import SAVE_DEFAULT, SAVE_INCREMENTAL, SAVE_COMPACT
+from jobs import MODE_STANDARD, MODE_STREAMING, MODE_INCREMENTAL, JobQueue
+from instrumentation import report_path_for
+from patterns import DEFAULT_GRAMMAR, DEFAULT_GRAMMAR_NAME, Grammar, PatternRegistry, get_registry
+from preview import THUMBNAIL_WIDTH, PreviewRenderer, ThumbnailCache, document_key, load_not_found, priority_order
+from startup import startup_report_lines
+
+# Intervalle de lecture des événements des traitements (ms)
+POLL_INTERVAL = 100
+
+# Délai avant le démarrage des processus de travail, une fois la fenêtre affichée (ms)
+WORKERS_START_DELAY = 500
+
+# Modes d'enregistrement du PDF annoté
+SAVE_MODE_LABELS = {
+    "Standard": SAVE_DEFAULT,
+    "Rapide (ajout en fin de fichier)": SAVE_INCREMENTAL,
+    "Compressé (diffusion)": SAVE_COMPACT,
+}
+
+# Espace entre les pages de l'aperçu (pixels)
+PAGE_GAP = 12
 
 class YazakiPDFAnnotator(ctk.CTk):
     def __init__(self):
@@ -13,7 +40,7 @@ class YazakiPDFAnnotator(ctk.CTk):
         
         # Configuration de la fenêtre
         self.title("Yazaki PDF Annotator")
-        self.geometry("800x600")
+        self.geometry("800x760")
         self.minsize(600, 500)
         ctk.set_appearance_mode("System")  # Modes: "System" (default), "Dark", "Light"
         ctk.set_default_color_theme("blue")  # Thèmes: "blue" (default), "green", "dark-blue"
@@ -22,14 +49,43 @@ class YazakiPDFAnnotator(ctk.CTk):
         self.excel_path = None
         self.pdf_path = None
         self.sheet_name = None
+        self.grammar = None
         self.output_path = None
         
         # Variables pour les colonnes par défaut
         self.circuit_column = "Wire Internal Name"
         self.sn_column = "SN FILS SIMPLE"
         
+        # Nombre de processus pour l'extraction du texte (1 = traitement séquentiel)
+        self.workers = 1
+        
+        # File des traitements: plusieurs paires Excel / PDF traitées par des processus séparés
+        # (chacun garde en mémoire les listes de fils déjà lues)
+        self.job_queue = JobQueue(workers=2)
+        self.job_rows = {}
+        self.polling = False
+        
+        # Aperçu des résultats: miniatures rendues par un thread dédié, gardées en cache
+        # d'un aperçu à l'autre (mémoire bornée)
+        self.preview_renderer = PreviewRenderer()
+        self.thumbnail_cache = ThumbnailCache()
+        self.preview_window = None
+        
+        # Grammaires des formats de plan (patterns.json), compilées au démarrage
+        try:
+            self.grammar_registry = get_registry()
+        except (OSError, ValueError) as e:
+            # patterns.json illisible ou motif invalide: l'application démarre avec le format d'origine
+            messagebox.showerror("Grammaire invalide", f"{e}\n\nFormat d'origine utilisé ({DEFAULT_GRAMMAR_NAME}).")
+            self.grammar_registry = PatternRegistry({DEFAULT_GRAMMAR_NAME: Grammar(DEFAULT_GRAMMAR_NAME, DEFAULT_GRAMMAR)})
+        
         # Créer l'UI
         self.create_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # pandas et PyMuPDF ne sont chargés que par les processus de travail, démarrés
+        # après l'affichage de la fenêtre
+        self.after(WORKERS_START_DELAY, self.job_queue.start)
     
     def create_ui(self):
         # Frame principal
@@ -102,19 +158,78 @@ class YazakiPDFAnnotator(ctk.CTk):
         pdf_browse_btn = ctk.CTkButton(pdf_path_frame, text="Parcourir", command=self.browse_pdf)
         pdf_browse_btn.pack(side="right")
         
+        # Format des plans du client (grammaire des numéros de circuit)
+        grammar_frame = ctk.CTkFrame(pdf_frame)
+        grammar_frame.pack(fill="x", padx=10, pady=(5, 10))
+        
+        grammar_label = ctk.CTkLabel(grammar_frame, text="Format des plans:")
+        grammar_label.pack(side="left", padx=(0, 10))
+        
+        self.grammar_var = ctk.StringVar(value=self.grammar_registry.default)
+        grammar_menu = ctk.CTkOptionMenu(grammar_frame, values=self.grammar_registry.names(), variable=self.grammar_var)
+        grammar_menu.pack(side="left")
+        
         # Bouton de traitement
         process_frame = ctk.CTkFrame(self.main_frame)
         process_frame.pack(fill="x", pady=20)
         
         self.process_btn = ctk.CTkButton(
             process_frame, 
-            text="Traiter le fichier", 
+            text="Ajouter à la file de traitement", 
             font=ctk.CTkFont(size=16, weight="bold"),
             height=50,
             command=self.process_file
         )
         self.process_btn.pack(pady=10)
         
+        # Mode de traitement: complet, page par page (flux) ou pages modifiées uniquement
+        self.mode_var = ctk.StringVar(value=MODE_STANDARD)
+        mode_selector = ctk.CTkSegmentedButton(
+            process_frame,
+            values=[MODE_STANDARD, MODE_STREAMING, MODE_INCREMENTAL],
+            variable=self.mode_var
+        )
+        mode_selector.pack(pady=(0, 10))
+        
+        # Enregistrement du résultat: standard, ajout en fin de fichier ou réécriture compressée
+        save_frame = ctk.CTkFrame(process_frame)
+        save_frame.pack(pady=(0, 10))
+        
+        save_label = ctk.CTkLabel(save_frame, text="Enregistrement:")
+        save_label.pack(side="left", padx=(0, 10))
+        
+        self.save_mode_var = ctk.StringVar(value="Standard")
+        save_menu = ctk.CTkOptionMenu(save_frame, values=list(SAVE_MODE_LABELS), variable=self.save_mode_var)
+        save_menu.pack(side="left")
+        
+        # Déplacer les annotations qui recouvriraient du texte, un tracé ou une autre annotation
+        self.avoid_overlaps_var = ctk.BooleanVar(value=True)
+        avoid_overlaps_check = ctk.CTkCheckBox(process_frame, text="Éviter les chevauchements des annotations",
+                                               variable=self.avoid_overlaps_var)
+        avoid_overlaps_check.pack(pady=(0, 10))
+        
+        # Profilage optionnel (cProfile et pic mémoire), ajouté au rapport de performance
+        self.profile_var = ctk.BooleanVar(value=False)
+        profile_check = ctk.CTkCheckBox(process_frame, text="Profiler le traitement (cProfile, mémoire)",
+                                        variable=self.profile_var)
+        profile_check.pack(pady=(0, 10))
+        
+        # File des traitements: une ligne par PDF (état, progression par page, annulation)
+        jobs_frame = ctk.CTkFrame(self.main_frame)
+        jobs_frame.pack(fill="x", padx=10, pady=(0, 10))
+        
+        jobs_header = ctk.CTkFrame(jobs_frame, fg_color="transparent")
+        jobs_header.pack(fill="x", padx=10, pady=(10, 0))
+        
+        jobs_label = ctk.CTkLabel(jobs_header, text="File de traitement:")
+        jobs_label.pack(side="left")
+        
+        cancel_all_btn = ctk.CTkButton(jobs_header, text="Tout annuler", width=110, command=self.cancel_all_jobs)
+        cancel_all_btn.pack(side="right")
+        
+        self.jobs_list = ctk.CTkScrollableFrame(jobs_frame, height=120)
+        self.jobs_list.pack(fill="x", padx=10, pady=10)
+        
         # Zone de log
         log_frame = ctk.CTkFrame(self.main_frame)
         log_frame.pack(fill="both", expand=True, padx=10, pady=10)
@@ -154,7 +269,7 @@ class YazakiPDFAnnotator(ctk.CTk):
             self.log(f"Fichier de sortie: {self.output_path}")
     
     def process_file(self):
-        """Traiter le fichier PDF avec les données Excel"""
+        """Ajouter la paire Excel / PDF sélectionnée à la file de traitement"""
         # Vérifier si les fichiers ont été sélectionnés
         if not self.excel_path:
             messagebox.showerror("Erreur", "Veuillez sélectionner un fichier Excel.")
@@ -164,319 +279,388 @@ class YazakiPDFAnnotator(ctk.CTk):
             messagebox.showerror("Erreur", "Veuillez sélectionner un fichier PDF.")
             return
         
-        # Récupérer le nom de la feuille
+        # Récupérer le nom de la feuille et la grammaire du format choisi
         self.sheet_name = self.sheet_var.get().strip() or None
+        self.grammar = self.grammar_registry.get(self.grammar_var.get())
+        
+        # Le traitement s'exécute dans un processus séparé: l'interface reste disponible
+        # pour ajouter d'autres fichiers pendant ce temps
+        try:
+            job = self.job_queue.submit(
+                self.excel_path,
+                self.pdf_path,
+                self.output_path,
+                sheet_name=self.sheet_name,
+                grammar=self.grammar,
+                mode=self.mode_var.get(),
+                save_mode=SAVE_MODE_LABELS[self.save_mode_var.get()],
+                profile=self.profile_var.get(),
+                circuit_col=self.circuit_column,
+                sn_col=self.sn_column,
+                workers=self.workers,
+                avoid_overlaps=self.avoid_overlaps_var.get()
+            )
+        except ValueError as e:
+            # Même fichier de sortie qu'un traitement pas encore terminé
+            messagebox.showerror("Erreur", f"{e}\n\nAttendez la fin de ce traitement ou annulez-le.")
+            return
+        self.add_job_row(job)
+        self.log(f"Traitement {job.job_id} ajouté à la file: {job.pdf_path}")
         
-        # Désactiver le bouton pendant le traitement
-        self.process_btn.configure(state="disabled", text="Traitement en cours...")
+        if not self.polling:
+            self.polling = True
+            self.after(POLL_INTERVAL, self.poll_jobs)
+    
+    def add_job_row(self, job):
+        """Ligne de la file: nom du PDF, état, barre de progression et bouton d'annulation"""
+        frame = ctk.CTkFrame(self.jobs_list)
+        frame.pack(fill="x", pady=2)
+        
+        name_label = ctk.CTkLabel(frame, text=os.path.basename(job.pdf_path), width=200, anchor="w")
+        name_label.pack(side="left", padx=(5, 10))
+        
+        progress_bar = ctk.CTkProgressBar(frame)
+        progress_bar.set(0)
+        progress_bar.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        
+        status_label = ctk.CTkLabel(frame, text="En attente", width=150, anchor="w")
+        status_label.pack(side="left", padx=(0, 10))
+        
+        cancel_btn = ctk.CTkButton(frame, text="Annuler", width=80,
+                                   command=lambda: self.job_queue.cancel(job.job_id))
+        cancel_btn.pack(side="right", padx=5)
+        
+        preview_btn = ctk.CTkButton(frame, text="Aperçu", width=80, state="disabled",
+                                    command=lambda: self.open_preview(job.output_path))
+        preview_btn.pack(side="right")
+        
+        self.job_rows[job.job_id] = {
+            'job': job,
+            'progress': progress_bar,
+            'status': status_label,
+            'cancel': cancel_btn,
+            'preview': preview_btn,
+            'state': None,
+        }
+    
+    def cancel_all_jobs(self):
+        self.job_queue.cancel_all()
+        self.log("Annulation des traitements en cours et en attente...")
+    
+    def poll_jobs(self):
+        """Appliquer les événements des traitements (boucle Tk, relancée par after())"""
+        for job_id, kind, data in self.job_queue.poll():
+            self.handle_job_event(self.job_rows[job_id], kind, data)
         
-        # Lancer le traitement dans un thread séparé pour ne pas bloquer l'UI
-        threading.Thread(target=self.run_processing).start()
+        if self.job_queue.pending() or any(row['state'] is None for row in self.job_rows.values()):
+            self.after(POLL_INTERVAL, self.poll_jobs)
+        else:
+            self.polling = False
+            self.finish_batch()
+    
+    def handle_job_event(self, row, kind, data):
+        job = row['job']
+        name = os.path.basename(job.pdf_path)
+        if kind == 'started':
+            row['status'].configure(text="Démarrage...")
+        elif kind == 'progress':
+            stage, page, page_count = data
+            row['progress'].set(page / page_count if page_count else 1)
+            row['status'].configure(text=f"{stage} {page}/{page_count}")
+        elif kind == 'log':
+            self.log(f"[{name}] {data}")
+        elif kind == 'done':
+            row['progress'].set(1)
+            self.finish_job_row(row, 'done', "Terminé")
+            row['preview'].configure(state="normal")
+            self.log(f"[{name}] Traitement terminé avec succès!")
+            self.log(f"[{name}] Résultat enregistré dans: {job.output_path}")
+        elif kind == 'error':
+            self.finish_job_row(row, 'error', "Erreur")
+            row['error'] = data
+            self.log(f"[{name}] Erreur lors du traitement: {data}")
+        elif kind == 'cancelled':
+            self.finish_job_row(row, 'cancelled', "Annulé")
+            self.log(f"[{name}] Traitement annulé (PDF annoté non enregistré)")
     
-    def run_processing(self):
-        """Exécuter le traitement dans un thread séparé"""
+    def finish_job_row(self, row, state, text):
+        row['state'] = state
+        row['status'].configure(text=text)
+        row['cancel'].configure(state="disabled")
+    
+    def finish_batch(self):
+        """Bilan des traitements une fois la file vide (dans la boucle Tk)"""
+        rows = [row for row in self.job_rows.values() if not row.get('reported')]
+        for row in rows:
+            row['reported'] = True
+        done = [row for row in rows if row['state'] == 'done']
+        errors = [row for row in rows if row['state'] == 'error']
+        
+        if errors:
+            details = "\n".join(f"{os.path.basename(row['job'].pdf_path)}: {row['error']}" for row in errors)
+            messagebox.showerror("Erreur", f"Une erreur s'est produite:\n{details}")
+        
+        if len(done) == 1 and len(rows) == 1:
+            # Proposer l'aperçu du fichier résultat
+            output_path = done[0]['job'].output_path
+            if messagebox.askyesno("Traitement terminé", f"Le fichier a été enregistré dans:\n{output_path}\n\nVoulez-vous afficher l'aperçu maintenant?"):
+                self.open_preview(output_path)
+        elif done:
+            messagebox.showinfo("Traitements terminés", f"{len(done)} fichiers annotés sur {len(rows)}.\n"
+                                "Bouton Aperçu de la file pour vérifier chaque résultat.")
+    
+    def open_preview(self, path):
+        """Afficher l'aperçu d'un PDF annoté (une seule fenêtre d'aperçu à la fois)"""
+        if self.preview_window is not None and self.preview_window.winfo_exists():
+            self.preview_window.close()
+        self.preview_window = PreviewWindow(self, self.preview_renderer, self.thumbnail_cache, path)
+    
+    def open_file(self, path):
         try:
-            self.log("Démarrage du traitement...")
-            self.log(f"Extraction des numéros de circuit du fichier {self.pdf_path}...")
-            
-            # Extraire les numéros de circuit
-            circuit_info = extract_circuit_numbers(self.pdf_path)
-            self.log(f"{len(circuit_info)} numéros de circuit trouvés.")
-            
-            self.log(f"Recherche des correspondances dans {self.excel_path}...")
-            
-            # Correspondre avec Excel
-            matched_info = match_with_excel(
-                circuit_info, 
-                self.excel_path, 
-                self.circuit_column, 
-                self.sn_column,
-                sheet_name=self.sheet_name
-            )
-            
-            self.log(f"Ajout des annotations au PDF...")
-            
-            # Ajouter les annotations
-            add_annotations_to_pdf(self.pdf_path, self.output_path, matched_info)
-            
-            self.log("Traitement terminé avec succès!")
-            self.log(f"Résultat enregistré dans: {self.output_path}")
-            
-            # Proposer d'ouvrir le fichier résultat
-            if messagebox.askyesno("Traitement terminé", f"Le fichier a été enregistré dans:\n{self.output_path}\n\nVoulez-vous l'ouvrir maintenant?"):
+            os.startfile(path)  # Windows
+        except:
+            try:
+                import subprocess
+                subprocess.Popen(['xdg-open', path])  # Linux
+            except:
                 try:
-                    os.startfile(self.output_path)  # Windows
+                    import subprocess
+                    subprocess.Popen(['open', path])  # macOS
                 except:
-                    try:
-                        import subprocess
-                        subprocess.Popen(['xdg-open', self.output_path])  # Linux
-                    except:
-                        try:
-                            import subprocess
-                            subprocess.Popen(['open', self.output_path])  # macOS
-                        except:
-                            messagebox.showinfo("Information", "Impossible d'ouvrir le fichier automatiquement. Veuillez l'ouvrir manuellement.")
-            
-        except Exception as e:
-            self.log(f"Erreur lors du traitement: {str(e)}")
-            messagebox.showerror("Erreur", f"Une erreur s'est produite: {str(e)}")
-        
-        finally:
-            # Réactiver le bouton
-            self.process_btn.configure(state="normal", text="Traiter le fichier")
+                    messagebox.showinfo("Information", "Impossible d'ouvrir le fichier automatiquement. Veuillez l'ouvrir manuellement.")
+    
+    def on_close(self):
+        """Fermer la fenêtre: annuler les traitements et arrêter les processus"""
+        if self.job_queue.pending() and not messagebox.askyesno(
+                "Traitements en cours", "Des traitements sont en cours. Les annuler et quitter?"):
+            return
+        self.job_queue.shutdown()
+        self.preview_renderer.stop()
+        self.destroy()
 
 
-# Fonctions de traitement (reprises du code original)
-def extract_circuit_numbers(pdf_path):
+class PreviewWindow(ctk.CTkToplevel):
     """
-    Extraire tous les numéros de circuit du PDF
+    Aperçu d'un PDF annoté: miniatures rendues en arrière-plan (voir preview.py), pages
+    visibles d'abord, et navigation entre les circuits "Non trouvé" du rapport du traitement
+    
+    Seules les pages visibles et leurs voisines sont affichées dans le canevas: les
+    autres restent dans le cache des miniatures, ou sont rendues à nouveau au besoin.
     """
-    circuit_info = []
-    circuits_to_skip = set()  # Pour stocker les circuits à ignorer (associés à un J)
+    def __init__(self, app, renderer, cache, path):
+        super().__init__(app)
+        self.app = app
+        self.renderer = renderer
+        self.cache = cache
+        self.path = path
+        self.title(f"Aperçu - {os.path.basename(path)}")
+        self.geometry(f"{THUMBNAIL_WIDTH + 2 * PAGE_GAP + 40}x800")
+        
+        # Circuits "Non trouvé": rapport écrit à côté du PDF annoté par le traitement
+        try:
+            not_found = load_not_found(report_path_for(path))
+            self.report_missing = False
+        except (OSError, ValueError, KeyError):
+            not_found = []
+            self.report_missing = True
+        
+        self.key = document_key(path)
+        self.document_id = renderer.open(path, not_found)
+        self.page_tops = []    # Ordonnée du haut de chaque page dans le canevas
+        self.page_zooms = []   # Pixels par point de chaque page
+        self.photos = {}       # Page affichée -> (PhotoImage, élément du canevas)
+        self.not_found = None  # (page, rectangle) des circuits "Non trouvé" sur la page affichée
+        self.not_found_index = -1
+        self.update_id = None
+        
+        self.create_ui()
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.poll_id = self.after(POLL_INTERVAL, self.poll_renderer)
     
-    # Ouvrir le PDF avec PyMuPDF
-    doc = fitz.open(pdf_path)
+    def create_ui(self):
+        toolbar = ctk.CTkFrame(self)
+        toolbar.pack(fill="x", padx=10, pady=(10, 5))
+        
+        self.page_label = ctk.CTkLabel(toolbar, text="Ouverture...", width=120, anchor="w")
+        self.page_label.pack(side="left", padx=(5, 10))
+        
+        prev_btn = ctk.CTkButton(toolbar, text="◀", width=30, command=lambda: self.goto_not_found(-1))
+        prev_btn.pack(side="left")
+        
+        self.not_found_label = ctk.CTkLabel(toolbar, text="", width=220)
+        self.not_found_label.pack(side="left", padx=5)
+        
+        next_btn = ctk.CTkButton(toolbar, text="▶", width=30, command=lambda: self.goto_not_found(1))
+        next_btn.pack(side="left")
+        
+        open_btn = ctk.CTkButton(toolbar, text="Ouvrir le PDF", width=110, command=lambda: self.app.open_file(self.path))
+        open_btn.pack(side="right", padx=5)
+        
+        body = ctk.CTkFrame(self)
+        body.pack(fill="both", expand=True, padx=10, pady=(5, 10))
+        
+        self.canvas = tk.Canvas(body, bg="#808080", highlightthickness=0, yscrollincrement=40,
+                                width=THUMBNAIL_WIDTH + 2 * PAGE_GAP)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        
+        scrollbar = ctk.CTkScrollbar(body, command=self.canvas.yview)
+        scrollbar.pack(side="right", fill="y")
+        
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            self.schedule_update()
+        
+        self.canvas.configure(yscrollcommand=on_scroll)
+        self.canvas.bind("<Configure>", lambda event: self.schedule_update())
+        # Molette: Windows et macOS (<MouseWheel>), Linux (<Button-4>, <Button-5>)
+        self.canvas.bind("<MouseWheel>", lambda event: self.canvas.yview_scroll(-1 if event.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda event: self.canvas.yview_scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda event: self.canvas.yview_scroll(1, "units"))
+        self.bind("<Prior>", lambda event: self.canvas.yview_scroll(-1, "pages"))
+        self.bind("<Next>", lambda event: self.canvas.yview_scroll(1, "pages"))
     
-    # Premier passage: identifier tous les numéros de circuit associés à un joint "J"
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        text = page.get_text()
-        
-        # Identifier les joints J et leurs circuits associés pour les ignorer
-        for j_match in re.finditer(r'J\d+\s*\n(\d+)', text):
-            circuit_to_skip = j_match.group(1)
-            circuits_to_skip.add(circuit_to_skip)
+    def poll_renderer(self):
+        """Appliquer les résultats du thread de rendu (boucle Tk, relancée par after())"""
+        for kind, data in self.renderer.poll(self.document_id):
+            if kind == 'opened':
+                self.layout_pages(data)
+            elif kind == 'page':
+                page_num, image = data
+                self.cache.put((self.key, page_num), image)
+                if page_num in self.displayed_range() and page_num not in self.photos:
+                    self.show_page(page_num, image)
+            elif kind == 'not_found':
+                self.not_found = data
+                self.update_not_found_label()
+            elif kind == 'error':
+                self.app.log(f"[Aperçu] Erreur: {data}")
+                if not self.page_tops:
+                    self.page_label.configure(text="Erreur")
+        self.poll_id = self.after(POLL_INTERVAL, self.poll_renderer)
     
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        text = page.get_text()
-        rotation = page.rotation
-        
-        # Obtenir les dimensions de la page
-        page_width = page.rect.width
-        page_height = page.rect.height
-        
-        # Extraire tous les part numbers (numéros suivis d'une lettre majuscule)
-        part_numbers = []
-        for part_match in re.finditer(r'\b\d+[A-Z]\b', text):
-            part_number = part_match.group(0)
-            if part_number not in part_numbers:  # Éviter les doublons
-                part_numbers.append(part_number)
-        
-        # Rechercher des patterns comme "7/W0007,COFLRYB-0.35,GY/W"
-        for match in re.finditer(r'(\d+)/W\d+,|J\+(\d+)\b', text):
-            if match.group(1):  # Cas standard "X/WXXX,"
-                circuit_num = match.group(1)
-                match_text = match.group(0)
-            else:  # Cas "J+XXX"
-                circuit_num = match.group(2)
-                match_text = match.group(0)
-            
-            # Vérifier si ce circuit doit être ignoré
-            if circuit_num in circuits_to_skip:
-                print(f"Circuit ignoré: {circuit_num} (associé à un joint)")
-                continue
-            
-            # Obtenir les coordonnées du texte pour permettre l'annotation
-            text_instances = page.search_for(match.group(0))
-            
-            if text_instances:
-                position = text_instances[0]
-                x0, y0, x1, y1 = position
-                
-                # Déterminer si le circuit est sur la moitié gauche ou droite de la page
-                is_left_side = (x0 + x1) / 2 < page_width / 2
-                
-                circuit_info.append({
-                    'page_num': page_num,
-                    'circuit_number': circuit_num,
-                    'match_text': match_text,
-                    'rect': position,
-                    'rotation': rotation,
-                    'is_left_side': is_left_side,
-                    'page_width': page_width,
-                    'page_height': page_height,
-                    'part_numbers': part_numbers  # Ajout des part numbers trouvés dans la page
-                })
+    def layout_pages(self, page_sizes):
+        """Emplacements des pages (rectangles blancs en attendant leur miniature)"""
+        y = PAGE_GAP
+        for page_num, (width, height) in enumerate(page_sizes):
+            zoom = THUMBNAIL_WIDTH / width
+            self.page_tops.append(y)
+            self.page_zooms.append(zoom)
+            bottom = y + round(height * zoom)
+            self.canvas.create_rectangle(PAGE_GAP, y, PAGE_GAP + THUMBNAIL_WIDTH, bottom, fill="white", outline="")
+            self.canvas.create_text(PAGE_GAP + THUMBNAIL_WIDTH / 2, (y + bottom) / 2, text=f"Page {page_num + 1}",
+                                    fill="#a0a0a0")
+            y = bottom + PAGE_GAP
+        self.canvas.configure(scrollregion=(0, 0, THUMBNAIL_WIDTH + 2 * PAGE_GAP, y))
+        self.schedule_update()
     
-    doc.close()
-    return circuit_info
-
-def match_with_excel(circuit_info, excel_path, circuit_col='Numéro Circuit', sn_col='SN FILS SIMPLE', sheet_name=None):
-    """
-    Correspondre les numéros de circuit avec le fichier Excel, en utilisant les part numbers si disponibles
-    """
-    # Lire le fichier Excel
-    try:
-        # Si sheet_name est None, pandas retourne toutes les feuilles dans un dictionnaire
-        # Dans ce cas, on prend la première feuille
-        excel_data = pd.read_excel(excel_path, sheet_name=sheet_name)
-        
-        # Vérifier si le résultat est un dictionnaire (cas où sheet_name=None)
-        if isinstance(excel_data, dict):
-            if not excel_data:  # Vérifier si le dictionnaire est vide
-                raise ValueError("Le fichier Excel ne contient aucune feuille")
-            
-            # Utiliser la première feuille si sheet_name est None
-            sheet_name = list(excel_data.keys())[0]
-            df = excel_data[sheet_name]
-            print(f"Utilisation de la première feuille: '{sheet_name}'")
-        else:
-            # Si excel_data est déjà un DataFrame, l'utiliser directement
-            df = excel_data
-            
-    except ValueError as e:
-        # Si le nom de feuille spécifié n'existe pas
-        if "No sheet named" in str(e):
-            # Afficher les noms de feuilles disponibles
-            xls = pd.ExcelFile(excel_path)
-            available_sheets = xls.sheet_names
-            raise ValueError(f"Feuille '{sheet_name}' non trouvée. Feuilles disponibles: {', '.join(available_sheets)}")
-        else:
-            raise e
+    def visible_pages(self):
+        """Première et dernière pages visibles dans le canevas"""
+        top = self.canvas.canvasy(0)
+        bottom = self.canvas.canvasy(self.canvas.winfo_height())
+        first = max(bisect.bisect_right(self.page_tops, top) - 1, 0)
+        last = max(bisect.bisect_right(self.page_tops, bottom) - 1, first)
+        return first, last
     
-    # Nettoyer les noms de colonnes (enlever tout ce qui suit ":")
-    df.columns = [str(col).split(':')[0] for col in df.columns]
+    def displayed_range(self):
+        """Pages à afficher: visibles, puis voisines (dans l'ordre de rendu)"""
+        if not self.page_tops:
+            return []
+        first, last = self.visible_pages()
+        return priority_order(first, last, len(self.page_tops))
     
-    # Convertir la colonne de numéro de circuit en type numérique si nécessaire
-    if circuit_col in df.columns and df[circuit_col].dtype != 'int64':
-        df[circuit_col] = pd.to_numeric(df[circuit_col], errors='coerce')
+    def schedule_update(self):
+        # Un seul recalcul par passage de la boucle Tk, quel que soit le nombre de défilements
+        if self.update_id is None:
+            self.update_id = self.after_idle(self.update_visible)
     
-    # Pour chaque circuit, chercher les correspondances dans Excel
-    for entry in circuit_info:
-        try:
-            circuit_num = int(entry['circuit_number'])
-            part_numbers = entry.get('part_numbers', [])
-            
-            # Vérifier si les part numbers de la page existent dans les colonnes de l'Excel
-            matching_columns = [col for col in df.columns if col in part_numbers]
-            
-            if matching_columns:
-                # Créer un masque pour les lignes qui contiennent la valeur "1" dans l'une des colonnes part_number
-                mask = pd.Series(False, index=df.index)
-                
-                # Vérifier chaque colonne part_number
-                for col in matching_columns:
-                    mask = mask | df[col].astype(str).isin(["1", "1.0"])
-                
-                # Filtrer le DataFrame pour les lignes qui correspondent au part_number=1 et au circuit_num
-                filtered_df = df[mask]
-                matching_row = filtered_df[filtered_df[circuit_col] == circuit_num]
-                
-                if not matching_row.empty:
-                    entry['sn_fils_simple'] = str(matching_row.iloc[0][sn_col])
-                    # Ajouter SN GROUP si disponible
-                    if "SN GROUP" in df.columns:
-                        entry['sn_group'] = str(matching_row.iloc[0]["SN GROUP"])
-                else:
-                    # Si pas de correspondance avec part_number, chercher juste par circuit_num
-                    matching_row = df[df[circuit_col] == circuit_num]
-                    if not matching_row.empty:
-                        entry['sn_fils_simple'] = str(matching_row.iloc[0][sn_col])
-                        if "SN GROUP" in df.columns:
-                            entry['sn_group'] = str(matching_row.iloc[0]["SN GROUP"])
-                    else:
-                        entry['sn_fils_simple'] = "Non trouvé"
-                        entry['sn_group'] = ""
+    def update_visible(self):
+        """Afficher les pages visibles depuis le cache et demander le rendu des autres"""
+        self.update_id = None
+        if not self.page_tops:
+            return
+        first, last = self.visible_pages()
+        self.page_label.configure(text=f"Page {first + 1}/{len(self.page_tops)}")
+        
+        displayed = self.displayed_range()
+        for page_num in set(self.photos) - set(displayed):
+            # Page sortie de la zone affichée: libérer son image Tk
+            self.canvas.delete(self.photos.pop(page_num)[1])
+        
+        missing = []
+        for page_num in displayed:
+            if page_num in self.photos:
+                continue
+            image = self.cache.get((self.key, page_num))
+            if image is None:
+                missing.append(page_num)
             else:
-                # Si aucun part_number correspondant, chercher simplement par circuit_num
-                matching_row = df[df[circuit_col] == circuit_num]
-                if not matching_row.empty:
-                    entry['sn_fils_simple'] = str(matching_row.iloc[0][sn_col])
-                    if "SN GROUP" in df.columns:
-                        entry['sn_group'] = str(matching_row.iloc[0]["SN GROUP"])
-                else:
-                    entry['sn_fils_simple'] = "Non trouvé"
-                    entry['sn_group'] = ""
-        except (ValueError, TypeError):
-            # Si le circuit_number n'est pas convertible en entier
-            entry['sn_fils_simple'] = "Erreur de format"
-            entry['sn_group'] = ""
+                self.show_page(page_num, image)
+        self.renderer.request(missing)
     
-    return circuit_info
-
-def add_annotations_to_pdf(pdf_path, output_path, annotations):
-    """
-    Ajouter des annotations au PDF existant avec positionnement adapté
-    """
-    # Ouvrir le PDF
-    doc = fitz.open(pdf_path)
-    
-    # Grouper les annotations par page
-    annotations_by_page = {}
-    for ann in annotations:
-        page_num = ann['page_num']
-        if page_num not in annotations_by_page:
-            annotations_by_page[page_num] = []
-        annotations_by_page[page_num].append(ann)
+    def show_page(self, page_num, image):
+        photo = ImageTk.PhotoImage(image)
+        item = self.canvas.create_image(PAGE_GAP, self.page_tops[page_num], anchor="nw", image=photo)
+        self.photos[page_num] = (photo, item)
+        self.canvas.tag_raise("highlight")
     
-    # Parcourir chaque page et ajouter les annotations
-    for page_num in range(len(doc)):
-        if page_num in annotations_by_page:
-            page = doc[page_num]
-            page_rotation = page.rotation
-            
-            for ann in annotations_by_page[page_num]:
-                circuit_num = ann['circuit_number']
-                sn_fils = ann['sn_fils_simple']
-                sn_group = ann.get('sn_group', '')
-                rect = ann['rect']
-                is_left_side = ann['is_left_side']
-                
-                # Calculer la position de l'annotation
-                x0, y0, x1, y1 = rect
-                
-                # Préparer le texte à ajouter
-                if sn_group:
-                    annotation_text = f"{sn_fils}"#f"{sn_fils} ({sn_group})"
-                else:
-                    annotation_text = f"{sn_fils}"
-                
-                # Déterminer la position en fonction de la position du circuit et de la rotation
-                if page_rotation == 0:
-                    if is_left_side:
-                        text_point = fitz.Point(x0 - 90, y0 + (y1 - y0)/2)
-                    else:
-                        text_point = fitz.Point(x1 + 90, y0 + (y1 - y0)/2)
-                
-                elif page_rotation == 90:
-                    if is_left_side:
-                        text_point = fitz.Point(x0 + (x1 - x0)/2 + 50, y0 - 10)
-                    else:
-                        text_point = fitz.Point(x0 + (x1 - x0)/2 + 50, y1 + 10)
-                
-                elif page_rotation == 180:
-                    if is_left_side:
-                        text_point = fitz.Point(x1 + 110, y0 + (y1 - y0)/2)
-                    else:
-                        text_point = fitz.Point(x0 - 110, y0 + (y1 - y0)/2)
-                
-                elif page_rotation == 270:
-                    if is_left_side:
-                        text_point = fitz.Point(x0 + (x1 - x0)/2, y1 + 90)
-                    else:
-                        text_point = fitz.Point(x0 + (x1 - x0)/2, y0 - 90)
-                
-                # Ajouter l'annotation (texte en rouge)
-                page.insert_text(
-                    text_point,
-                    annotation_text,
-                    fontsize=10,
-                    color=(1, 0, 0),  # Rouge (R,G,B)
-                    rotate=page_rotation
-                )
+    def update_not_found_label(self):
+        if self.report_missing:
+            text = "Rapport du traitement introuvable"
+        elif self.not_found is None:
+            text = ""
+        elif self.not_found_index >= 0:
+            text = f"Non trouvé {self.not_found_index + 1}/{len(self.not_found)}"
+        elif self.not_found:
+            text = f"{len(self.not_found)} circuits non trouvés"
+        else:
+            text = "Aucun circuit non trouvé"
+        self.not_found_label.configure(text=text)
     
-    # Enregistrer le PDF modifié
-    doc.save(output_path)
-    doc.close()
+    def goto_not_found(self, step):
+        """Aller au circuit "Non trouvé" suivant (step=1) ou précédent (step=-1)"""
+        if not self.not_found:
+            return
+        self.not_found_index = (self.not_found_index + step) % len(self.not_found)
+        page_num, (x0, y0, x1, y1) = self.not_found[self.not_found_index]
+        zoom = self.page_zooms[page_num]
+        top = self.page_tops[page_num]
+        
+        # Encadrer le numéro de circuit (annotation à côté) et le centrer verticalement dans le canevas
+        self.canvas.delete("highlight")
+        self.canvas.create_rectangle(PAGE_GAP + x0 * zoom - 3, top + y0 * zoom - 3, PAGE_GAP + x1 * zoom + 3,
+                                     top + y1 * zoom + 3, outline="#ff8c00", width=3, tags="highlight")
+        total_height = float(self.canvas.cget("scrollregion").split()[3])
+        center = top + (y0 + y1) / 2 * zoom
+        self.canvas.yview_moveto(max(center - self.canvas.winfo_height() / 2, 0) / total_height)
+        self.update_not_found_label()
     
-    return True
+    def close(self):
+        """Fermer l'aperçu: le thread de rendu libère le document"""
+        self.after_cancel(self.poll_id)
+        if self.update_id is not None:
+            self.after_cancel(self.update_id)
+        self.renderer.close()
+        self.app.log(self.cache.stats_line())
+        self.destroy()
+
 
 if __name__ == "__main__":
+    # Processus de travail de la file de traitement (exécutable Windows)
+    multiprocessing.freeze_support()
+    
     # Créer un dossier "assets" s'il n'existe pas
     assets_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
     os.makedirs(assets_dir, exist_ok=True)
     
     # Lancer l'application
     app = YazakiPDFAnnotator()
+    
+    if "--startup-report" in sys.argv:
+        # Mesure du démarrage: durée jusqu'à l'affichage de la fenêtre, puis fermeture
+        app.update()
+        window_seconds = time.perf_counter() - START_TIME
+        app.destroy()
+        print("\n".join(startup_report_lines("App", window_seconds)))
+        sys.exit(0)
+    
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+Benchmark de extract_circuit_numbers: version actuelle vs version d'origine
+(deux appels à get_text par page et un page.search_for par correspondance)
+
+Usage: python benchmarks/bench_extraction.py [nombre_de_pages] [processus]
+"""
+import os
+import re
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from synthetic import generate_harness_pdf
+from processing import extract_circuit_numbers, page_text_index
+
+
+def legacy_extract_circuit_numbers(pdf_path):
+    """
+    Version d'origine (deux appels à get_text par page), conservée pour comparaison
+    """
+    circuit_info = []
+    circuits_to_skip = set()
+    doc = fitz.open(pdf_path)
+
+    for page_num in range(len(doc)):
+        text = doc[page_num].get_text()
+        for j_match in re.finditer(r'J\d+\s*\n(\d+)', text):
+            circuits_to_skip.add(j_match.group(1))
+
+    for page_num in range(len(doc)):
+        page = doc[page_num]
+        text = page.get_text()
+        page_width = page.rect.width
+        part_numbers = []
+        for part_match in re.finditer(r'\b\d+[A-Z]\b', text):
+            if part_match.group(0) not in part_numbers:
+                part_numbers.append(part_match.group(0))
+        for match in re.finditer(r'(\d+)/W\d+,|J\+(\d+)\b', text):
+            circuit_num = match.group(1) or match.group(2)
+            if circuit_num in circuits_to_skip:
+                continue
+            text_instances = page.search_for(match.group(0))
+            if text_instances:
+                x0, y0, x1, y1 = text_instances[0]
+                circuit_info.append({
+                    'page_num': page_num,
+                    'circuit_number': circuit_num,
+                    'match_text': match.group(0),
+                    'rect': text_instances[0],
+                    'rotation': page.rotation,
+                    'is_left_side': (x0 + x1) / 2 < page_width / 2,
+                    'page_width': page_width,
+                    'page_height': page.rect.height,
+                    'part_numbers': part_numbers,
+                })
+
+    doc.close()
+    return circuit_info
+
+
+def same_text(pdf_path):
+    """Texte reconstruit par l'extraction identique à page.get_text() sur toutes les pages"""
+    with fitz.open(pdf_path) as doc:
+        return all(page_text_index(page)[0] == page.get_text() for page in doc)
+
+
+def _comparable(circuit_info):
+    return [{key: value for key, value in entry.items() if key not in ('rect', 'is_left_side')}
+            for entry in circuit_info]
+
+
+def _with_rects(circuit_info):
+    return [dict(entry, rect=tuple(entry['rect'])) for entry in circuit_info]
+
+
+def _moved_positions(legacy, current):
+    """Occurrences répétées que la version d'origine plaçait sur la première copie"""
+    return sum(1 for old, new in zip(legacy, current) if tuple(old['rect']) != tuple(new['rect']))
+
+
+def main(pages=400, workers=os.cpu_count() or 1):
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = generate_harness_pdf(os.path.join(tmp, "harness.pdf"), pages=pages)
+
+        start = time.perf_counter()
+        legacy = legacy_extract_circuit_numbers(pdf_path)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        current = extract_circuit_numbers(pdf_path)
+        current_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel = extract_circuit_numbers(pdf_path, workers=workers)
+        parallel_time = time.perf_counter() - start
+        text_identical = same_text(pdf_path)
+
+    print(f"{pages} pages, {len(current)} circuits")
+    print(f"  version d'origine : {legacy_time:.3f} s")
+    print(f"  version actuelle  : {current_time:.3f} s ({legacy_time / current_time:.2f}x)")
+    print(f"  {str(workers) + ' processus':<18}: {parallel_time:.3f} s ({legacy_time / parallel_time:.2f}x)")
+    print(f"  parallèle identique au séquentiel: {_with_rects(parallel) == _with_rects(current)}")
+    print(f"  texte identique à get_text(): {text_identical}")
+    print(f"  circuits identiques: {_comparable(legacy) == _comparable(current)}")
+    print(f"  positions corrigées (libellés répétés): {_moved_positions(legacy, current)}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,92 @@
+"""
+Benchmark de match_with_excel: index WireListIndex et mode batch (fusions de DataFrames)
+vs parcours du DataFrame par circuit
+
+Usage: python benchmarks/bench_matching.py [lignes_excel] [circuits]
+"""
+import copy
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from synthetic import generate_wire_list, part_number_names
+from processing import load_wire_list, match_with_excel
+
+
+def legacy_match(circuit_info, df, circuit_col, sn_col):
+    """
+    Boucle d'origine de match_with_excel (un masque et un filtre complet par circuit)
+    """
+    for entry in circuit_info:
+        try:
+            circuit_num = int(entry['circuit_number'])
+            part_numbers = entry.get('part_numbers', [])
+            matching_columns = [col for col in df.columns if col in part_numbers]
+            matching_row = pd.DataFrame()
+            if matching_columns:
+                mask = pd.Series(False, index=df.index)
+                for col in matching_columns:
+                    mask = mask | df[col].astype(str).isin(["1", "1.0"])
+                filtered_df = df[mask]
+                matching_row = filtered_df[filtered_df[circuit_col] == circuit_num]
+            if matching_row.empty:
+                matching_row = df[df[circuit_col] == circuit_num]
+            if not matching_row.empty:
+                entry['sn_fils_simple'] = str(matching_row.iloc[0][sn_col])
+                if "SN GROUP" in df.columns:
+                    entry['sn_group'] = str(matching_row.iloc[0]["SN GROUP"])
+            else:
+                entry['sn_fils_simple'] = "Non trouvé"
+                entry['sn_group'] = ""
+        except (ValueError, TypeError):
+            entry['sn_fils_simple'] = "Erreur de format"
+            entry['sn_group'] = ""
+    return circuit_info
+
+
+def synthetic_circuit_info(count, circuits, seed=0):
+    """Entrées comparables à celles d'extract_circuit_numbers (sans géométrie)"""
+    rng = random.Random(seed)
+    pages = [part_number_names(3)[:k] for k in range(4)]  # 0 à 3 part numbers par page
+    return [
+        {'circuit_number': str(rng.randint(1, circuits + 50)), 'part_numbers': pages[i % 4]}
+        for i in range(count)
+    ]
+
+
+def main(rows=20000, count=5000):
+    circuit_col, sn_col = "Wire Internal Name", "SN FILS SIMPLE"
+    circuit_info = synthetic_circuit_info(count, circuits=600)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        excel_path = generate_wire_list(os.path.join(tmp, "wire_list.xlsx"), rows=rows)
+
+        # Les deux mesures incluent la lecture du fichier Excel
+        start = time.perf_counter()
+        df = load_wire_list(excel_path, circuit_col)
+        load_time = time.perf_counter() - start
+        legacy = legacy_match(copy.deepcopy(circuit_info), df, circuit_col, sn_col)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        current = match_with_excel(copy.deepcopy(circuit_info), excel_path, circuit_col, sn_col)
+        current_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = match_with_excel(copy.deepcopy(circuit_info), excel_path, circuit_col, sn_col, batch=True)
+        batch_time = time.perf_counter() - start
+
+    print(f"{rows} lignes Excel, {count} circuits (dont lecture Excel: {load_time:.3f} s)")
+    print(f"  parcours du DataFrame : {legacy_time:.3f} s")
+    print(f"  index                 : {current_time:.3f} s ({legacy_time / current_time:.1f}x)")
+    print(f"  batch                 : {batch_time:.3f} s ({legacy_time / batch_time:.1f}x)")
+    print(f"  résultats identiques: {legacy == current == batch}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
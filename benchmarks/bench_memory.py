@@ -0,0 +1,80 @@
+"""
+Benchmark mémoire des circuits extraits: CircuitRecord (__slots__, PageInfo partagé)
+vs un dict par circuit avec fitz.Rect (représentation d'origine)
+
+Usage: python benchmarks/bench_memory.py [pages] [circuits_par_page]
+"""
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from synthetic import generate_harness_pdf, generate_wire_list
+from processing import CircuitRecord, PageInfo, extract_circuit_numbers, load_wire_list, match_with_wire_list
+
+
+def legacy_entries(records):
+    """Même contenu, au format d'origine: un dict par circuit, rect en fitz.Rect (liste des part numbers partagée par page)"""
+    return [record.to_dict() for record in records]
+
+
+def measure(build):
+    """Mémoire retenue (octets) par le résultat de build()"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main(pages=200, circuits_per_page=60):
+    circuit_col, sn_col = "Wire Internal Name", "SN FILS SIMPLE"
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = generate_harness_pdf(os.path.join(tmp, "harness.pdf"), pages=pages,
+                                        circuits_per_page=circuits_per_page, rotations=(0, 90, 180, 270))
+        excel_path = generate_wire_list(os.path.join(tmp, "wire_list.xlsx"), rows=5000)
+        df = load_wire_list(excel_path, circuit_col)
+
+        records = extract_circuit_numbers(pdf_path)
+
+    # Les deux représentations sont reconstruites sous tracemalloc à partir des mêmes données
+    source = [record.to_dict() for record in records]
+    for label, matched in (("après extraction", False), ("après correspondance", True)):
+        records, record_size = measure(lambda: _records_from(source, matched, df, circuit_col, sn_col))
+        entries, dict_size = measure(lambda: _entries_from(records, matched, df, circuit_col, sn_col))
+        assert entries == records
+        print(f"{len(records)} circuits, {pages} pages, {label}:")
+        print(f"  dict par circuit : {dict_size / 1024:8.0f} Ko ({dict_size / len(records):.0f} o/circuit)")
+        print(f"  CircuitRecord    : {record_size / 1024:8.0f} Ko ({record_size / len(records):.0f} o/circuit, "
+              f"{dict_size / record_size:.1f}x moins)")
+
+
+def _records_from(source, matched, df, circuit_col, sn_col):
+    page_infos = {}
+    records = []
+    for entry in source:
+        page_info = page_infos.get(entry['page_num'])
+        if page_info is None:
+            page_info = page_infos[entry['page_num']] = PageInfo(
+                entry['page_num'], entry['rotation'], entry['page_width'], entry['page_height'],
+                list(entry['part_numbers']))
+        records.append(CircuitRecord(page_info, entry['circuit_number'], entry['match_text'],
+                                     entry['rect'], entry['is_left_side']))
+    if matched:
+        match_with_wire_list(records, df, circuit_col, sn_col)
+    return records
+
+
+def _entries_from(records, matched, df, circuit_col, sn_col):
+    entries = legacy_entries(records)
+    if matched:
+        match_with_wire_list(entries, df, circuit_col, sn_col)
+    return entries
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,91 @@
+"""
+Benchmark de l'aperçu du PDF annoté: délai d'affichage des premières pages, rendu de
+toutes les miniatures, circuits "Non trouvé" du rapport et mémoire du cache
+
+Usage: python benchmarks/bench_preview.py [pages] [circuits_par_page]
+
+Mesure le thread de rendu (preview.PreviewRenderer) comme l'utilise la fenêtre d'aperçu:
+pages visibles demandées à l'ouverture, puis saut au milieu du plan. Vérifie que la
+liste des circuits "Non trouvé" reçue correspond aux résultats du traitement et reste
+sur les pages affichées.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import generate_harness_pdf, generate_wire_list
+from instrumentation import Metrics, report_path_for
+from preview import DEFAULT_CACHE_BYTES, PreviewRenderer, ThumbnailCache, load_not_found, priority_order
+from processing import NOT_FOUND, add_annotations_to_pdf, extract_circuit_numbers, load_wire_list, match_with_wire_list
+
+
+def wait_for(renderer, document_id, cache, condition):
+    """Lire les événements jusqu'à condition(événements reçus); durée en secondes"""
+    start = time.perf_counter()
+    received = []
+    while not condition(received):
+        for kind, data in renderer.poll(document_id):
+            received.append((kind, data))
+            if kind == 'page':
+                cache.put(data[0], data[1])
+            elif kind == 'error':
+                raise RuntimeError(data)
+        time.sleep(0.001)
+    return time.perf_counter() - start, received
+
+
+def pages_received(pages):
+    return lambda received: pages <= {data[0] for kind, data in received if kind == 'page'}
+
+
+def main(pages=300, circuits_per_page=60):
+    circuit_col, sn_col = "Wire Internal Name", "SN FILS SIMPLE"
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = generate_harness_pdf(os.path.join(tmp, "harness.pdf"), pages=pages,
+                                        circuits_per_page=circuits_per_page, rotations=(0, 90, 180, 270))
+        # Liste de fils incomplète: une partie des circuits est annotée "Non trouvé"
+        excel_path = generate_wire_list(os.path.join(tmp, "wire_list.xlsx"), rows=3000,
+                                        circuits=circuits_per_page * 7)
+        output_path = os.path.join(tmp, "harness_annotated.pdf")
+        matched_info = match_with_wire_list(extract_circuit_numbers(pdf_path), load_wire_list(excel_path, circuit_col),
+                                            circuit_col, sn_col)
+        metrics = Metrics()
+        add_annotations_to_pdf(pdf_path, output_path, matched_info, metrics=metrics)
+        report_path = metrics.write_report(report_path_for(output_path))
+        print(f"{pages} pages, {len(matched_info)} annotations")
+
+        renderer = PreviewRenderer()
+        cache = ThumbnailCache()
+        document_id = renderer.open(output_path, load_not_found(report_path))
+        opened, received = wait_for(renderer, document_id, cache,
+                                    lambda received: any(kind == 'not_found' for kind, _ in received))
+        page_sizes = [data for kind, data in received if kind == 'opened'][0]
+        not_found = [data for kind, data in received if kind == 'not_found'][0]
+        renderer.request(priority_order(0, 1, pages))
+        first, _ = wait_for(renderer, document_id, cache, pages_received({0, 1}))
+        print(f"  ouverture (et rapport)  {opened:8.3f} s")
+        print(f"  2 premières pages       {first:8.3f} s")
+
+        # Saut au milieu du plan
+        middle = pages // 2
+        renderer.request(priority_order(middle, middle + 1, pages))
+        jump, _ = wait_for(renderer, document_id, cache, pages_received({middle, middle + 1}))
+        print(f"  saut page {middle + 1:<4}          {jump:8.3f} s")
+
+        expected = sum(entry['sn_fils_simple'] == NOT_FOUND for entry in matched_info)
+        on_page = all(0 <= x0 and 0 <= y0 and x1 <= page_sizes[page_num][0] and y1 <= page_sizes[page_num][1]
+                      for page_num, (x0, y0, x1, y1) in not_found)
+        print(f"  circuits Non trouvé: {len(not_found)} reçus, {expected} attendus, tous sur la page: {on_page}")
+
+        # Rendu de toutes les pages (défilement complet)
+        renderer.request(range(pages))
+        full, _ = wait_for(renderer, document_id, cache, pages_received(set(range(pages - 1, pages))))
+        print(f"  rendu de toutes les pages {full:6.3f} s ({full / pages * 1000:.1f} ms par page)")
+        print(f"  {cache.stats_line()} (limite par défaut {DEFAULT_CACHE_BYTES // 1024 // 1024} Mo)")
+        renderer.stop()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,79 @@
+"""
+Benchmark des modes d'enregistrement du PDF annoté: durée d'écriture et taille du fichier
+
+Usage: python benchmarks/bench_save.py [pages] [fils_par_page]
+
+Mesure add_annotations_to_pdf pour un plan complet, puis la mise à jour d'une page
+d'un PDF déjà annoté (cas du traitement incrémental), avec chaque mode, pour un plan
+aux flux compressés et pour le même plan exporté sans compression.
+"""
+import os
+import sys
+import tempfile
+
+import fitz  # PyMuPDF
+
+from synthetic import generate_harness_pdf, generate_wire_list
+from instrumentation import Metrics
+from processing import (SAVE_MODES, add_annotations_to_pdf, extract_circuit_numbers, load_wire_list,
+                        match_with_wire_list)
+
+
+def same_rendering(path_a, path_b, pages):
+    """Comparer le rendu de quelques pages"""
+    with fitz.open(path_a) as doc_a, fitz.open(path_b) as doc_b:
+        return all(doc_a[page].get_pixmap(dpi=50).samples == doc_b[page].get_pixmap(dpi=50).samples
+                   for page in pages)
+
+
+def timed_save(pdf_path, output_path, matched_info, save_mode, **options):
+    """add_annotations_to_pdf mesuré: ligne de résultat (écriture, total, taille)"""
+    metrics = Metrics()
+    with metrics.timer('total'):
+        add_annotations_to_pdf(pdf_path, output_path, matched_info, metrics=metrics, save_mode=save_mode, **options)
+    return (f"    {save_mode:<14} {metrics.stage_time('save'):8.3f} s {metrics.stage_time('total'):8.3f} s "
+            f"{os.path.getsize(output_path) / 1024 / 1024:8.1f} Mo")
+
+
+def bench_source(directory, pdf_path, matched_info, pages):
+    """Mesurer chaque mode d'enregistrement pour un PDF source"""
+    print(f"source {os.path.basename(pdf_path)}: {os.path.getsize(pdf_path) / 1024 / 1024:.1f} Mo")
+    print("  plan complet     écriture      total     taille")
+    outputs = {}
+    for save_mode in SAVE_MODES:
+        outputs[save_mode] = os.path.join(directory, f"out_{save_mode}.pdf")
+        print(timed_save(pdf_path, outputs[save_mode], matched_info, save_mode))
+
+    # Mise à jour d'une page d'un résultat existant (le fichier de sortie sert de base)
+    print("  mise à jour d'une page")
+    for save_mode in SAVE_MODES:
+        print(timed_save(pdf_path, outputs[save_mode], matched_info, save_mode,
+                         previous_output=outputs[save_mode], changed_pages={0}))
+
+    reference = outputs[SAVE_MODES[0]]
+    checked_pages = (0, 1, pages - 1)
+    print(f"  rendus identiques: {all(same_rendering(reference, path, checked_pages) for path in outputs.values())}")
+
+
+def main(pages=100, wires_per_page=400):
+    circuit_col, sn_col = "Wire Internal Name", "SN FILS SIMPLE"
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = generate_harness_pdf(os.path.join(tmp, "harness.pdf"), pages=pages,
+                                        rotations=(0, 90, 180, 270), wires_per_page=wires_per_page)
+        excel_path = generate_wire_list(os.path.join(tmp, "wire_list.xlsx"), rows=5000)
+        matched_info = match_with_wire_list(extract_circuit_numbers(pdf_path),
+                                            load_wire_list(excel_path, circuit_col), circuit_col, sn_col)
+
+        # Même plan, flux non compressés (courant pour les exports de logiciels de CAO)
+        expanded_path = os.path.join(tmp, "harness_expanded.pdf")
+        with fitz.open(pdf_path) as doc:
+            doc.save(expanded_path, expand=255)
+
+        print(f"{pages} pages, {wires_per_page} fils par page, {len(matched_info)} annotations")
+        for source_path in (pdf_path, expanded_path):
+            bench_source(tmp, source_path, matched_info, pages)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
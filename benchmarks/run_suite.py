@@ -0,0 +1,209 @@
+"""
+Suite de benchmarks reproductible: extract_circuit_numbers, match_with_excel et
+add_annotations_to_pdf sur des plans et listes de fils synthétiques de plusieurs tailles
+
+Usage: python benchmarks/run_suite.py [--sizes small medium large] [--repeat 3] [--label texte]
+
+Les fichiers sont générés avec des graines fixes (mêmes plans et classeurs à chaque
+exécution). Chaque exécution est ajoutée à l'historique (JSON, une ligne par taille)
+et comparée à la précédente exécution de même taille sur la même machine.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+import pandas as pd
+
+from synthetic import REPO_ROOT, generate_harness_pdf, generate_wire_list
+from instrumentation import Metrics
+from processing import add_annotations_to_pdf, extract_circuit_numbers, match_with_excel
+
+# Tailles de plans: pages, circuits par page, lignes de la liste de fils
+SIZES = {
+    'small': {'pages': 10, 'circuits_per_page': 60, 'rows': 2000},
+    'medium': {'pages': 100, 'circuits_per_page': 60, 'rows': 20000},
+    'large': {'pages': 400, 'circuits_per_page': 80, 'rows': 50000},
+}
+
+ROTATIONS = (0, 90, 180, 270)
+OPERATIONS = ('extract_circuit_numbers', 'match_with_excel', 'add_annotations_to_pdf')
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "history.jsonl")
+
+# Écart (en proportion) au-delà duquel une opération est signalée comme plus lente
+REGRESSION_THRESHOLD = 0.10
+
+
+def generate_inputs(directory, size):
+    """Générer (ou réutiliser) le plan et la liste de fils d'une taille"""
+    params = SIZES[size]
+    name = f"{params['pages']}p_{params['circuits_per_page']}c_{params['rows']}r"
+    pdf_path = os.path.join(directory, f"harness_{name}.pdf")
+    excel_path = os.path.join(directory, f"wire_list_{name}.xlsx")
+    if not os.path.exists(pdf_path):
+        generate_harness_pdf(pdf_path, pages=params['pages'], circuits_per_page=params['circuits_per_page'],
+                             rotations=ROTATIONS)
+    if not os.path.exists(excel_path):
+        # Mêmes numéros de circuit que le plan (1 à circuits_per_page * 10)
+        generate_wire_list(excel_path, rows=params['rows'], circuits=params['circuits_per_page'] * 10)
+    return pdf_path, excel_path
+
+
+def time_runs(function, repeat):
+    """Exécuter function repeat fois: (dernier résultat, durées en secondes)"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    return result, durations
+
+
+def run_size(directory, size, repeat):
+    """Mesurer les trois opérations pour une taille et retourner l'entrée d'historique"""
+    circuit_col, sn_col = "Wire Internal Name", "SN FILS SIMPLE"
+    pdf_path, excel_path = generate_inputs(directory, size)
+    output_path = os.path.join(directory, f"harness_{size}_annotated.pdf")
+
+    durations = {}
+    circuit_info, durations['extract_circuit_numbers'] = time_runs(
+        lambda: extract_circuit_numbers(pdf_path), repeat)
+    matched_info, durations['match_with_excel'] = time_runs(
+        lambda: match_with_excel(circuit_info, excel_path, circuit_col, sn_col), repeat)
+    _, durations['add_annotations_to_pdf'] = time_runs(
+        lambda: add_annotations_to_pdf(pdf_path, output_path, matched_info), repeat)
+
+    # Une exécution instrumentée pour le détail par étape (get_text, search, insert_text...)
+    metrics = Metrics()
+    extracted = extract_circuit_numbers(pdf_path, metrics=metrics)
+    add_annotations_to_pdf(pdf_path, output_path, match_with_excel(extracted, excel_path, circuit_col, sn_col),
+                           metrics=metrics)
+
+    results = [entry['sn_fils_simple'] for entry in matched_info]
+    return {
+        'size': size,
+        'params': SIZES[size],
+        'circuits': len(matched_info),
+        'not_found': results.count("Non trouvé"),
+        'timings': {
+            operation: {
+                'min': min(runs),
+                'median': statistics.median(runs),
+                'runs': runs,
+            }
+            for operation, runs in durations.items()
+        },
+        'stages': {stage: seconds for stage, (seconds, _) in metrics.stages.items()},
+        'output_bytes': os.path.getsize(output_path),
+    }
+
+
+def environment():
+    """Machine, versions et révision du code mesuré"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'machine': platform.node(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'pymupdf': fitz.VersionBind,
+        'pandas': pd.__version__,
+    }
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_entry(history, entry):
+    """Dernière exécution comparable: même taille, mêmes paramètres, même machine"""
+    for candidate in reversed(history):
+        if (candidate['size'] == entry['size'] and candidate['params'] == entry['params']
+                and candidate['environment']['machine'] == entry['environment']['machine']):
+            return candidate
+    return None
+
+
+def compare(previous, entry):
+    """Lignes de comparaison des durées minimales avec l'exécution précédente"""
+    lines = []
+    for operation in OPERATIONS:
+        before = previous['timings'][operation]['min']
+        after = entry['timings'][operation]['min']
+        change = (after - before) / before if before else 0.0
+        flag = "  <- plus lent" if change > REGRESSION_THRESHOLD else ""
+        lines.append(f"    {operation:<24} {before:8.3f} s -> {after:8.3f} s ({change:+.0%}){flag}")
+    return lines
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks du traitement sur des plans synthétiques.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=['small', 'medium'],
+                        help="Tailles à mesurer")
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre de mesures par opération")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="Fichier d'historique des résultats (JSON lines)")
+    parser.add_argument("--data-dir", default=None,
+                        help="Dossier des fichiers générés, réutilisés d'une exécution à l'autre (par défaut temporaire)")
+    parser.add_argument("--label", default="", help="Description de l'exécution (ex. nom de la modification)")
+    parser.add_argument("--no-record", action="store_true", help="Ne pas ajouter les résultats à l'historique")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    history = load_history(options.history)
+    env = environment()
+    timestamp = datetime.datetime.now().isoformat(timespec="seconds")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = options.data_dir or tmp
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for size in options.sizes:
+            entry = run_size(directory, size, options.repeat)
+            entry.update({'timestamp': timestamp, 'label': options.label, 'environment': env})
+            entries.append(entry)
+
+            params = entry['params']
+            print(f"{size}: {params['pages']} pages, {entry['circuits']} circuits, {params['rows']} lignes Excel")
+            for operation in OPERATIONS:
+                timing = entry['timings'][operation]
+                print(f"    {operation:<24} min {timing['min']:.3f} s, médiane {timing['median']:.3f} s")
+            previous = previous_entry(history, entry)
+            if previous:
+                print(f"  comparé à {previous['timestamp']} ({previous['environment']['commit']}"
+                      f"{' ' + previous['label'] if previous['label'] else ''}):")
+                for line in compare(previous, entry):
+                    print(line)
+
+    if not options.no_record:
+        os.makedirs(os.path.dirname(os.path.abspath(options.history)), exist_ok=True)
+        with open(options.history, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        print(f"Résultats ajoutés à {options.history}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
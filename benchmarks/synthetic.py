@@ -0,0 +1,100 @@
+"""
+Génération de plans de câblage synthétiques pour les benchmarks
+
+Les plans clients ne pouvant pas être partagés, ces fonctions produisent des PDF
+qui reprennent les motifs reconnus par App.py: libellés de circuit "7/W0007,...",
+connecteurs "J+12", joints "J3" suivis d'un numéro de circuit et part numbers "1234A",
+ainsi que des listes de fils Excel au format "Wire Internal Name" / "SN FILS SIMPLE".
+"""
+import os
+import random
+import sys
+
+import fitz  # PyMuPDF
+import pandas as pd
+
+# Rendre processing.py importable depuis le dossier benchmarks
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def generate_harness_pdf(path, pages=50, circuits_per_page=60, joints_per_page=2,
+                         part_numbers_per_page=3, rotations=(0,), seed=0, wires_per_page=0):
+    """
+    Générer un PDF synthétique et retourner le chemin du fichier créé
+    
+    wires_per_page ajoute des tracés vectoriels (fils en lignes brisées), pour des pages
+    aussi lourdes que les plans réels.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+
+    for page_num in range(pages):
+        page = doc.new_page(width=1190, height=842)  # Format A3 paysage
+
+        # Part numbers de la page (cartouche en bas à droite)
+        for i, part_number in enumerate(part_number_names(part_numbers_per_page)):
+            page.insert_text((950, 700 + 12 * i), part_number, fontsize=8)
+
+        # Joints "J" suivis du circuit associé sur la ligne suivante
+        for i in range(joints_per_page):
+            x, y = rng.uniform(450, 700), rng.uniform(60, 650)
+            circuit = rng.randint(1, circuits_per_page * 10)
+            page.insert_text((x, y), f"J{i + 1}\n{circuit}", fontsize=7)
+
+        # Libellés de circuit répartis sur les deux moitiés de la page
+        for i in range(circuits_per_page):
+            circuit = rng.randint(1, circuits_per_page * 10)
+            x = rng.choice((rng.uniform(120, 420), rng.uniform(760, 1000)))
+            y = 60 + (i * 590 / max(circuits_per_page, 1)) + rng.uniform(0, 4)
+            if i % 10 == 9:
+                label = f"J+{circuit}"
+            else:
+                label = f"{circuit}/W{circuit:04d},COFLRYB-0.35,GY/W"
+            page.insert_text((x, y), label, fontsize=6)
+
+        # Fils: lignes brisées entre les deux moitiés de la page
+        if wires_per_page:
+            shape = page.new_shape()
+            for _ in range(wires_per_page):
+                y = rng.uniform(60, 650)
+                points = [fitz.Point(rng.uniform(120, 420), y)]
+                for _ in range(4):
+                    points.append(fitz.Point(rng.uniform(420, 760), rng.uniform(60, 650)))
+                points.append(fitz.Point(rng.uniform(760, 1000), y))
+                shape.draw_polyline(points)
+            shape.finish(color=(0, 0, 0), width=0.3)
+            shape.commit()
+        
+        page.set_rotation(rotations[page_num % len(rotations)])
+
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def part_number_names(count):
+    """Part numbers utilisés par generate_harness_pdf"""
+    return [f"{7100 + i}{chr(65 + i % 26)}" for i in range(count)]
+
+
+def generate_wire_list(path, rows=20000, circuits=600, part_numbers=3, seed=0):
+    """
+    Générer une liste de fils Excel et retourner le chemin du fichier créé
+
+    Chaque circuit apparaît sur plusieurs lignes, chacune marquée "1" pour un
+    sous-ensemble des colonnes part number (en-têtes "7100A:Variante ...").
+    """
+    rng = random.Random(seed)
+    names = part_number_names(part_numbers)
+    data = {
+        "Wire Internal Name": [rng.randint(1, circuits) for _ in range(rows)],
+        "SN FILS SIMPLE": [f"SN{rng.randint(1, 99999):05d}" for _ in range(rows)],
+        "SN GROUP": [f"G{rng.randint(1, 50)}" for _ in range(rows)],
+    }
+    for name in names:
+        data[f"{name}:Variante {name}"] = [1 if rng.random() < 0.3 else None for _ in range(rows)]
+
+    pd.DataFrame(data).to_excel(path, index=False)
+    return path
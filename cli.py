@@ -0,0 +1,234 @@
+"""
+Annotation en ligne de commande, sans interface graphique
+
+Exemple:
+    python cli.py --excel liste_fils.xlsx plans/ autre_plan.pdf --jobs 4
+
+Chaque PDF produit un fichier "<nom>_avec_SN_FILS.pdf" et un résumé JSON
+"<nom>_avec_SN_FILS.json" (nombre de circuits, correspondances, durées par étape et par
+page, compteurs; profil cProfile et pic mémoire avec --profile / --trace-memory).
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from excel_cache import DEFAULT_CACHE_DIR, WireListCache
+from incremental import process_pdf_incremental
+from instrumentation import Metrics, profiling
+from patterns import DEFAULT_PATTERNS_PATH, get_grammar
+from processing import SAVE_DEFAULT, SAVE_MODES, process_pdf, process_pdf_streaming
+
+OUTPUT_SUFFIX = "_avec_SN_FILS"
+
+# Liste de fils et grammaire chargées une seule fois par processus (voir _init_worker)
+_wire_list = None
+_grammar = None
+
+
+def collect_pdfs(inputs):
+    """Développer les dossiers en liste de PDF, en ignorant les résultats déjà annotés et les doublons"""
+    pdf_paths = []
+    seen = set()
+    for path in inputs:
+        if os.path.isdir(path):
+            candidates = sorted(glob.glob(os.path.join(path, "*.pdf")))
+        else:
+            candidates = [path]
+        for candidate in candidates:
+            if os.path.splitext(candidate)[0].endswith(OUTPUT_SUFFIX):
+                continue
+            # Même fichier donné deux fois (directement et via son dossier...): traité une fois
+            key = os.path.normcase(os.path.realpath(candidate))
+            if key not in seen:
+                seen.add(key)
+                pdf_paths.append(candidate)
+    return pdf_paths
+
+
+def output_path_for(pdf_path, output_dir=None):
+    """Chemin du PDF annoté, à côté du PDF source ou dans output_dir"""
+    base_name = os.path.splitext(pdf_path)[0]
+    if output_dir:
+        base_name = os.path.join(output_dir, os.path.basename(base_name))
+    return f"{base_name}{OUTPUT_SUFFIX}.pdf"
+
+
+def duplicate_outputs(pdf_paths, output_paths):
+    """PDF sources écrivant le même fichier de sortie (ex. a/plan.pdf et b/plan.pdf avec --output-dir)"""
+    sources = {}
+    for pdf_path, output_path in zip(pdf_paths, output_paths):
+        sources.setdefault(os.path.normcase(os.path.abspath(output_path)), []).append(pdf_path)
+    return {output_path: paths for output_path, paths in sources.items() if len(paths) > 1}
+
+
+def _init_worker(excel_path, circuit_col, sn_col, sheet_name, cache_dir, grammar_name, patterns_path):
+    global _wire_list, _grammar
+    _grammar = get_grammar(grammar_name, patterns_path)
+    _wire_list = WireListCache(cache_dir).load(excel_path, circuit_col, sn_col, sheet_name=sheet_name,
+                                               grammar=_grammar)
+
+
+def _run_job(pdf_path, output_path, options):
+    """Traiter un PDF et écrire son résumé JSON; les erreurs sont reportées dans le résumé"""
+    start = time.perf_counter()
+    metrics = Metrics()
+    profile_path = os.path.splitext(output_path)[0] + ".prof" if options.profile else None
+    try:
+        with profiling(metrics, options.profile, options.trace_memory, profile_path):
+            summary = _process(pdf_path, output_path, options, metrics)
+        summary['metrics'] = metrics.to_dict()
+        summary['status'] = "ok"
+    except Exception as e:
+        summary = {
+            'pdf': pdf_path,
+            'output': output_path,
+            'status': "error",
+            'error': str(e),
+            'timings': {'total': time.perf_counter() - start},
+        }
+
+    summary_path = os.path.splitext(output_path)[0] + ".json"
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+def _process(pdf_path, output_path, options, metrics):
+    """Traiter un PDF selon le mode choisi et retourner son résumé"""
+    if options.streaming:
+        return process_pdf_streaming(
+            pdf_path,
+            output_path,
+            _wire_list,
+            options.circuit_column,
+            options.sn_column,
+            grammar=_grammar,
+            metrics=metrics,
+            save_mode=options.save_mode,
+            avoid_overlaps=not options.fixed_placement,
+        )
+    if options.incremental:
+        return process_pdf_incremental(
+            pdf_path,
+            output_path,
+            _wire_list,
+            options.circuit_column,
+            options.sn_column,
+            log=lambda message: print(f"{pdf_path}: {message}"),
+            grammar=_grammar,
+            metrics=metrics,
+            save_mode=options.save_mode,
+            avoid_overlaps=not options.fixed_placement,
+        )
+    return process_pdf(
+        pdf_path,
+        output_path,
+        _wire_list,
+        options.circuit_column,
+        options.sn_column,
+        workers=options.workers,
+        batch=options.batch,
+        grammar=_grammar,
+        metrics=metrics,
+        save_mode=options.save_mode,
+        avoid_overlaps=not options.fixed_placement,
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Annoter des PDF avec les données de la liste de fils Excel.")
+    parser.add_argument("inputs", nargs="+", help="Fichiers PDF ou dossiers contenant des PDF")
+    parser.add_argument("--excel", required=True, help="Fichier Excel de la liste de fils")
+    parser.add_argument("--sheet", default=None, help="Nom de la feuille (par défaut la première)")
+    parser.add_argument("--circuit-column", default="Wire Internal Name", help="Colonne des numéros de circuit")
+    parser.add_argument("--sn-column", default="SN FILS SIMPLE", help="Colonne à écrire sur le PDF")
+    parser.add_argument("--grammar", default=None,
+                        help="Format des plans (grammaire de patterns.json, par défaut celle du fichier)")
+    parser.add_argument("--patterns", default=DEFAULT_PATTERNS_PATH, help="Fichier des grammaires")
+    parser.add_argument("--output-dir", default=None, help="Dossier des résultats (par défaut à côté des PDF)")
+    parser.add_argument("--jobs", type=int, default=1, help="Nombre de PDF traités en parallèle")
+    parser.add_argument("--workers", type=int, default=1, help="Processus d'extraction par PDF")
+    parser.add_argument("--batch", action="store_true", help="Correspondance Excel vectorisée (gros volumes)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--streaming", action="store_true",
+                      help="Traiter chaque PDF page par page (mémoire constante)")
+    mode.add_argument("--incremental", action="store_true",
+                      help="Ne retraiter que les pages et circuits modifiés depuis le dernier passage")
+    parser.add_argument("--save-mode", choices=SAVE_MODES, default=SAVE_DEFAULT,
+                        help="Enregistrement des PDF: default (réécriture simple), incremental (ajout en fin de "
+                             "fichier, rapide), compact (réécriture compressée, fichiers plus petits)")
+    parser.add_argument("--fixed-placement", action="store_true",
+                        help="Annotations aux décalages fixes d'origine, sans éviter les chevauchements")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Dossier du cache des listes de fils")
+    parser.add_argument("--no-cache", action="store_true", help="Ne pas utiliser le cache disque des listes de fils")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profiler chaque PDF avec cProfile (<nom>.prof et fonctions les plus coûteuses dans le résumé)")
+    parser.add_argument("--trace-memory", action="store_true", help="Mesurer le pic mémoire avec tracemalloc")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global _wire_list, _grammar
+    options = parse_args(argv)
+    pdf_paths = collect_pdfs(options.inputs)
+    if not pdf_paths:
+        print("Aucun fichier PDF à traiter.", file=sys.stderr)
+        return 1
+
+    output_paths = [output_path_for(pdf_path, options.output_dir) for pdf_path in pdf_paths]
+    duplicates = duplicate_outputs(pdf_paths, output_paths)
+    if duplicates:
+        # Deux traitements écriraient le même PDF, résumé et manifeste (en même temps avec --jobs)
+        for output_path, paths in duplicates.items():
+            print(f"Même fichier de sortie {output_path} pour: {', '.join(paths)}", file=sys.stderr)
+        return 1
+    if options.output_dir:
+        os.makedirs(options.output_dir, exist_ok=True)
+    cache_dir = None if options.no_cache else options.cache_dir
+
+    # Compiler les motifs et charger la liste de fils une première fois: les processus la relisent
+    # depuis le cache disque
+    try:
+        grammar = get_grammar(options.grammar, options.patterns)
+    except (OSError, ValueError) as e:
+        print(f"Grammaire invalide: {e}", file=sys.stderr)
+        return 1
+    cache = WireListCache(cache_dir)
+    load_metrics = Metrics()
+    try:
+        wire_list = cache.load(options.excel, options.circuit_column, options.sn_column, sheet_name=options.sheet,
+                               grammar=grammar, metrics=load_metrics)
+    except (OSError, ValueError) as e:
+        print(f"Liste de fils illisible: {e}", file=sys.stderr)
+        return 1
+    print(f"{cache.stats_line()} ({load_metrics.stage_time('excel_load'):.2f} s)")
+
+    init_args = (options.excel, options.circuit_column, options.sn_column, options.sheet, cache_dir,
+                 options.grammar, options.patterns)
+    if options.jobs > 1:
+        with ProcessPoolExecutor(max_workers=options.jobs, initializer=_init_worker, initargs=init_args) as executor:
+            summaries = list(executor.map(_run_job, pdf_paths, output_paths, [options] * len(pdf_paths)))
+    else:
+        _wire_list = wire_list
+        _grammar = grammar
+        summaries = [_run_job(pdf_path, output_path, options)
+                     for pdf_path, output_path in zip(pdf_paths, output_paths)]
+
+    errors = 0
+    for summary in summaries:
+        if summary['status'] == "ok":
+            print(f"{summary['pdf']}: {summary['found']}/{summary['circuits']} circuits annotés "
+                  f"en {summary['timings']['total']:.2f} s -> {summary['output']}")
+        else:
+            errors += 1
+            print(f"{summary['pdf']}: erreur - {summary['error']}", file=sys.stderr)
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Cache des listes de fils Excel
+
+Une liste de fils lue et nettoyée est conservée en mémoire pour les traitements
+suivants, et enregistrée sur disque (Parquet si pyarrow est disponible, sinon pickle)
+pour que les exécutions suivantes n'aient plus à relire le classeur avec openpyxl.
+Le cache est invalidé dès que la date de modification ou la taille du fichier change.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from instrumentation import Metrics
+from patterns import get_grammar
+from processing import load_wire_list, wire_list_columns
+from startup import lazy_import
+
+pd = lazy_import("pandas")
+
+# À incrémenter si le format des fichiers du cache ou le nettoyage des colonnes change
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "yazaki_pdf_annotator")
+
+
+class WireListCache:
+    """
+    Listes de fils chargées, par (chemin, date de modification, taille, feuille, colonnes,
+    forme des colonnes part number)
+
+    Une seule version d'un classeur/feuille/colonnes est gardée en mémoire: une nouvelle
+    version du fichier remplace l'ancienne (processus de travail de l'interface, qui
+    durent autant que la fenêtre).
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._frames = {}
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def load(self, excel_path, circuit_col, sn_col, sheet_name=None, grammar=None, metrics=None):
+        """Retourner la liste de fils nettoyée, en la lisant depuis Excel seulement si nécessaire"""
+        if grammar is None:
+            grammar = get_grammar()
+        if metrics is None:
+            metrics = Metrics()
+        with metrics.timer('excel_load'):
+            return self._load(excel_path, circuit_col, sn_col, sheet_name, grammar, metrics)
+
+    def _load(self, excel_path, circuit_col, sn_col, sheet_name, grammar, metrics):
+        excel_path = os.path.abspath(excel_path)
+        stat = os.stat(excel_path)
+        key = (excel_path, stat.st_mtime_ns, stat.st_size, sheet_name, circuit_col, sn_col,
+               grammar.part_number_column.pattern)
+
+        with self._lock:
+            if key in self._frames:
+                self.memory_hits += 1
+                metrics.count('wire_list_memory_hits')
+                return self._frames[key]
+
+            df = self._read_disk(key)
+            if df is not None:
+                self.disk_hits += 1
+                metrics.count('wire_list_disk_hits')
+            else:
+                self.misses += 1
+                metrics.count('wire_list_reads')
+                df = load_wire_list(excel_path, circuit_col, sheet_name=sheet_name,
+                                    columns=wire_list_columns(circuit_col, sn_col, grammar))
+                self._write_disk(key, df)
+
+            # Retirer les versions précédentes du même classeur/feuille/colonnes
+            identity = self._identity(key)
+            for old_key in [old_key for old_key in self._frames if self._identity(old_key) == identity]:
+                del self._frames[old_key]
+            self._frames[key] = df
+            return df
+
+    def stats(self):
+        return {'memory_hits': self.memory_hits, 'disk_hits': self.disk_hits, 'misses': self.misses}
+
+    def stats_line(self):
+        return (f"Cache Excel: {self.memory_hits} en mémoire, {self.disk_hits} sur disque, "
+                f"{self.misses} lecture(s) du classeur")
+
+    @staticmethod
+    def _identity(key):
+        """Clé sans la version du fichier (date de modification, taille)"""
+        return (key[0],) + key[3:]
+
+    def _entry_path(self, key):
+        # Une entrée par classeur/feuille/colonnes: une nouvelle version du fichier remplace l'ancienne
+        excel_path, sheet_name, circuit_col, sn_col, part_number_column = self._identity(key)
+        name = f"{CACHE_VERSION}|{excel_path}|{sheet_name}|{circuit_col}|{sn_col}|{part_number_column}"
+        return os.path.join(self.cache_dir, hashlib.sha1(name.encode("utf-8")).hexdigest())
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+            if (meta['mtime_ns'], meta['size']) != key[1:3]:
+                return None
+            if meta['format'] == "parquet":
+                return pd.read_parquet(entry_path + ".parquet")
+            return pd.read_pickle(entry_path + ".pkl")
+        except Exception:
+            # Entrée absente, incomplète ou illisible: relire le classeur
+            return None
+
+    def _write_disk(self, key, df):
+        if not self.cache_dir:
+            return
+        entry_path = self._entry_path(key)
+        # Fichiers temporaires propres au processus (plusieurs processus de travail peuvent
+        # écrire la même entrée en même temps)
+        temp = f".{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            file_format = "parquet"
+            try:
+                df.to_parquet(entry_path + ".parquet" + temp, index=False)
+                if not pd.read_parquet(entry_path + ".parquet" + temp).equals(df):
+                    raise ValueError("types de colonnes modifiés par Parquet")
+            except Exception:
+                # pyarrow absent ou colonnes de types mixtes non représentables en Parquet
+                if os.path.exists(entry_path + ".parquet" + temp):
+                    os.remove(entry_path + ".parquet" + temp)
+                file_format = "pkl"
+                df.to_pickle(entry_path + ".pkl" + temp)
+            os.replace(f"{entry_path}.{file_format}{temp}", f"{entry_path}.{file_format}")
+
+            meta = {'mtime_ns': key[1], 'size': key[2], 'format': file_format, 'path': key[0]}
+            with open(entry_path + ".json" + temp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(entry_path + ".json" + temp, entry_path + ".json")
+        except OSError as e:
+            print(f"Impossible d'écrire le cache Excel: {e}")
@@ -0,0 +1,252 @@
+"""
+Traitement incrémental: ne retraiter que ce qui a changé depuis le dernier passage
+
+Un manifeste JSON est enregistré à côté du PDF annoté. Il contient, pour chaque page,
+l'empreinte de son contenu, les circuits extraits et les valeurs Excel écrites, ainsi
+qu'une empreinte des lignes Excel de chaque circuit. Au passage suivant:
+- seules les pages dont le contenu a changé sont ré-extraites;
+- seuls les circuits de ces pages, ou dont les lignes Excel ont changé, sont recherchés;
+- les pages dont les annotations sont inchangées sont reprises du PDF annoté précédent.
+"""
+import hashlib
+import json
+import os
+import time
+
+from instrumentation import Metrics
+from patterns import get_grammar
+from processing import (SAVE_DEFAULT, CircuitRecord, PageInfo, add_annotations_to_pdf, build_summary, extract_page,
+                        match_with_wire_list, record_not_found)
+from startup import lazy_import
+
+fitz = lazy_import("fitz")  # PyMuPDF
+pd = lazy_import("pandas")
+
+# À incrémenter si le contenu du manifeste ou l'extraction change
+MANIFEST_VERSION = 3
+
+# Clés des circuits conservées dans le manifeste (les part numbers sont stockés par page,
+# la rotation et les dimensions sont relues sur le PDF source)
+CANDIDATE_KEYS = ('circuit_number', 'match_text', 'is_left_side')
+
+
+def manifest_path_for(output_path):
+    return os.path.splitext(output_path)[0] + ".manifest.json"
+
+
+def page_fingerprint(doc, page):
+    """Empreinte du contenu d'une page: flux de contenu, formulaires (XObjects), rotation et format"""
+    digest = hashlib.sha1()
+    digest.update(f"{page.rotation}|{tuple(page.mediabox)}|{tuple(page.cropbox)}".encode())
+    digest.update(page.read_contents())
+    for xobject in page.get_xobjects():
+        digest.update(doc.xref_stream_raw(xobject[0]) or b"")
+    return digest.hexdigest()
+
+
+def wire_list_fingerprints(wire_list, circuit_col):
+    """
+    Empreinte des colonnes de la liste de fils et, par numéro de circuit, de ses lignes
+
+    Les lignes d'un circuit sont prises dans l'ordre du fichier, qui détermine la
+    priorité des correspondances.
+    """
+    columns = hashlib.sha1("|".join(map(str, wire_list.columns)).encode()).hexdigest()
+
+    rows_by_circuit = {}
+    row_hashes = pd.util.hash_pandas_object(wire_list, index=False).tolist()
+    for row_hash, circuit in zip(row_hashes, wire_list[circuit_col].tolist()):
+        if pd.isna(circuit) or circuit != int(circuit):
+            continue
+        rows_by_circuit.setdefault(str(int(circuit)), []).append(row_hash)
+
+    circuits = {
+        circuit: hashlib.sha1(repr(hashes).encode()).hexdigest()[:16]
+        for circuit, hashes in rows_by_circuit.items()
+    }
+    return columns, circuits
+
+
+def _circuit_key(circuit_number):
+    try:
+        return str(int(circuit_number))
+    except (ValueError, TypeError):
+        return None
+
+
+def _load_manifest(manifest_path, output_path, page_count, grammar, avoid_overlaps):
+    """Manifeste précédent, ou None s'il est absent ou ne correspond plus au PDF annoté"""
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        stat = os.stat(output_path)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get('version') != MANIFEST_VERSION or len(manifest.get('pages', [])) != page_count:
+        return None
+    # Autres motifs: toutes les pages sont à ré-extraire
+    if manifest.get('grammar') != grammar.fingerprint():
+        return None
+    # Autre placement des annotations: toutes les pages sont à réécrire
+    if manifest.get('avoid_overlaps') != avoid_overlaps:
+        return None
+    # Le PDF annoté a été modifié ou remplacé depuis: il ne peut plus servir de base
+    if manifest.get('output') != [stat.st_mtime_ns, stat.st_size]:
+        return None
+    return manifest
+
+
+def process_pdf_incremental(pdf_path, output_path, wire_list, circuit_col='Numéro Circuit',
+                            sn_col='SN FILS SIMPLE', log=print, grammar=None, metrics=None, save_mode=SAVE_DEFAULT,
+                            progress=None, avoid_overlaps=True):
+    """
+    Traiter un PDF en réutilisant le manifeste du passage précédent, et retourner un résumé
+    
+    Avec save_mode=SAVE_INCREMENTAL, les pages refaites sont ajoutées à la fin du PDF annoté
+    au lieu de le réécrire: rapide, mais le fichier grossit à chaque passage (les anciennes
+    versions des pages restent dans le fichier).
+    progress(page_num, page_count, page_circuits) est appelé après chaque page examinée,
+    puis après chaque page réécrite (voir add_annotations_to_pdf).
+    """
+    if grammar is None:
+        grammar = get_grammar()
+    if metrics is None:
+        metrics = Metrics()
+    start = time.perf_counter()
+    manifest_path = manifest_path_for(output_path)
+
+    doc = fitz.open(pdf_path)
+    # Fermé aussi en cas d'erreur ou d'annulation (JobCancelled levée par progress)
+    try:
+        page_count = len(doc)
+        previous = _load_manifest(manifest_path, output_path, page_count, grammar, avoid_overlaps)
+        previous_pages = previous['pages'] if previous else [None] * page_count
+
+        # Extraction: réutiliser les pages dont l'empreinte n'a pas changé
+        pages = []
+        page_infos = []
+        changed_content = set()
+        for page_num in range(page_count):
+            page = doc[page_num]
+            fingerprint = page_fingerprint(doc, page)
+            page_infos.append((page.rotation, page.rect.width, page.rect.height))
+            previous_page = previous_pages[page_num]
+            if previous_page and previous_page['hash'] == fingerprint:
+                pages.append(previous_page)
+                if progress:
+                    progress(page_num, page_count, len(previous_page['candidates']))
+                continue
+
+            changed_content.add(page_num)
+            candidates, circuits_to_skip = extract_page(page, page_num, grammar, metrics)
+            if progress:
+                progress(page_num, page_count, len(candidates))
+            pages.append({
+                'hash': fingerprint,
+                'skips': sorted(circuits_to_skip),
+                'part_numbers': candidates[0]['part_numbers'] if candidates else [],
+                'candidates': [
+                    dict({key: entry[key] for key in CANDIDATE_KEYS}, rect=list(entry['rect']))
+                    for entry in candidates
+                ],
+                'results': {},
+            })
+    finally:
+        doc.close()
+    metrics.add_time('extraction', time.perf_counter() - start)
+
+    # Reconstituer circuit_info, filtré par les joints de toutes les pages
+    circuits_to_skip = set()
+    for page in pages:
+        circuits_to_skip.update(page['skips'])
+
+    circuit_info = []
+    for page_num, page in enumerate(pages):
+        page_info = PageInfo(page_num, *page_infos[page_num], page['part_numbers'])
+        for index, candidate in enumerate(page['candidates']):
+            if candidate['circuit_number'] in circuits_to_skip:
+                continue
+            entry = CircuitRecord(page_info, candidate['circuit_number'], candidate['match_text'],
+                                  candidate['rect'], candidate['is_left_side'])
+            circuit_info.append((page_num, index, entry))
+    metrics.count('joint_circuits', len(circuits_to_skip))
+    metrics.count('circuits_skipped', sum(len(page['candidates']) for page in pages) - len(circuit_info))
+
+    # Correspondance: ne rechercher que les circuits des pages modifiées ou dont les lignes Excel ont changé
+    with metrics.timer('wire_list_fingerprint'):
+        columns_hash, circuit_hashes = wire_list_fingerprints(wire_list, circuit_col)
+    same_columns = previous is not None and previous['columns'] == columns_hash
+    previous_circuits = previous['circuits'] if previous else {}
+
+    to_match = []
+    for page_num, index, entry in circuit_info:
+        key = _circuit_key(entry['circuit_number'])
+        result = pages[page_num]['results'].get(str(index))
+        if (result is not None and same_columns and page_num not in changed_content
+                and circuit_hashes.get(key) == previous_circuits.get(key)):
+            entry['sn_fils_simple'] = result[0]
+            if result[1] is not None:
+                entry['sn_group'] = result[1]
+        else:
+            to_match.append(entry)
+    match_with_wire_list(to_match, wire_list, circuit_col, sn_col, metrics=metrics)
+
+    # Annotations: seules les pages dont le contenu ou les valeurs écrites ont changé sont refaites
+    start = time.perf_counter()
+    new_results = [{} for _ in range(page_count)]
+    for page_num, index, entry in circuit_info:
+        new_results[page_num][str(index)] = [entry['sn_fils_simple'], entry.get('sn_group')]
+
+    changed_pages = {
+        page_num for page_num in range(page_count)
+        if page_num in changed_content or new_results[page_num] != pages[page_num]['results']
+    }
+    for page_num, page in enumerate(pages):
+        page['results'] = new_results[page_num]
+
+    annotations = [entry for _, _, entry in circuit_info]
+    if previous is None:
+        add_annotations_to_pdf(pdf_path, output_path, annotations, metrics=metrics, save_mode=save_mode,
+                               progress=progress, avoid_overlaps=avoid_overlaps)
+    elif changed_pages:
+        add_annotations_to_pdf(pdf_path, output_path, annotations, previous_output=output_path,
+                               changed_pages=changed_pages, metrics=metrics, save_mode=save_mode,
+                               progress=progress, avoid_overlaps=avoid_overlaps)
+    else:
+        # PDF annoté inchangé: le rapport liste tout de même ses circuits non trouvés
+        record_not_found(metrics, annotations)
+    metrics.add_time('annotation', time.perf_counter() - start)
+
+    if previous is None or changed_pages or not same_columns or previous['circuits'] != circuit_hashes:
+        stat = os.stat(output_path)
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'pdf': os.path.abspath(pdf_path),
+            'grammar': grammar.fingerprint(),
+            'avoid_overlaps': avoid_overlaps,
+            'output': [stat.st_mtime_ns, stat.st_size],
+            'columns': columns_hash,
+            'circuits': circuit_hashes,
+            'pages': pages,
+        }
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    rewritten_pages = page_count if previous is None else len(changed_pages)
+    log(f"Incrémental: {len(changed_content)}/{page_count} pages ré-extraites, "
+        f"{len(to_match)}/{len(circuit_info)} circuits recherchés, {rewritten_pages} pages réécrites")
+
+    metrics.count('pages_reextracted', len(changed_content))
+    metrics.count('circuits_rematched', len(to_match))
+    metrics.count('pages_rewritten', rewritten_pages)
+
+    summary = build_summary(pdf_path, output_path, annotations, metrics.timings())
+    summary.update({
+        'reextracted_pages': len(changed_content),
+        'rematched_circuits': len(to_match),
+        'rewritten_pages': rewritten_pages,
+        'metrics': metrics.to_dict(),
+    })
+    return summary
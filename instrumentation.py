@@ -0,0 +1,162 @@
+"""
+Mesures de performance du traitement: durées par étape et par page, compteurs,
+profilage cProfile et pic mémoire tracemalloc optionnels
+
+Étapes mesurées par le pipeline (voir processing.py):
+- extraction, matching, annotation: étapes principales (résumé "timings");
+- get_text (texte et positions d'une page), search (motifs de la grammaire),
+  excel_load, insert_text (annotations d'une page), placement (index du texte et des
+  tracés d'une page, voir placement.py) et save (écriture du PDF);
+- joint_scan (relevé des joints du mode page par page) et wire_list_fingerprint
+  (empreintes Excel du mode incrémental).
+
+Un objet Metrics ne contient que des dict et des nombres: il peut être renvoyé par un
+processus de travail puis fusionné (merge) dans celui du processus principal.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Étapes principales, dans l'ordre du traitement
+MAIN_STAGES = ('extraction', 'matching', 'annotation')
+
+
+class Metrics:
+    """
+    Durées cumulées par étape (et par page) et compteurs d'un traitement
+    """
+    def __init__(self):
+        self.stages = {}    # étape -> [secondes, nombre d'appels]
+        self.pages = {}     # numéro de page -> {étape: secondes}
+        self.counters = {}
+        self.extra = {}     # résultats du profilage (voir profiling), circuits non trouvés (voir record_not_found)
+
+    @contextmanager
+    def timer(self, stage, page=None):
+        """Mesurer la durée d'un bloc with, ajoutée à l'étape (et à la page si indiquée)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start, page)
+
+    def add_time(self, stage, seconds, page=None):
+        entry = self.stages.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+        if page is not None:
+            page_stages = self.pages.setdefault(page, {})
+            page_stages[stage] = page_stages.get(stage, 0.0) + seconds
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def stage_time(self, stage):
+        return self.stages.get(stage, (0.0, 0))[0]
+
+    def timings(self):
+        """Durées des étapes principales et total, au format du résumé de traitement"""
+        timings = {stage: self.stage_time(stage) for stage in MAIN_STAGES}
+        timings['total'] = sum(timings.values())
+        return timings
+
+    def merge(self, other):
+        """Ajouter les mesures d'un autre Metrics (processus de travail)"""
+        for stage, (seconds, calls) in other.stages.items():
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += calls
+        for page, page_stages in other.pages.items():
+            for stage, seconds in page_stages.items():
+                self.pages.setdefault(page, {})
+                self.pages[page][stage] = self.pages[page].get(stage, 0.0) + seconds
+        for name, value in other.counters.items():
+            self.count(name, value)
+        self.extra.update(other.extra)
+
+    def slowest_pages(self, count=5):
+        """Pages les plus longues à traiter: liste de (numéro de page, secondes)"""
+        totals = [(page, sum(page_stages.values())) for page, page_stages in self.pages.items()]
+        return sorted(totals, key=lambda item: item[1], reverse=True)[:count]
+
+    def to_dict(self):
+        """Rapport sérialisable en JSON"""
+        report = {
+            'stages': {stage: {'seconds': seconds, 'calls': calls} for stage, (seconds, calls) in self.stages.items()},
+            'counters': dict(self.counters),
+            'pages': {str(page): self.pages[page] for page in sorted(self.pages)},
+        }
+        report.update(self.extra)
+        return report
+
+    def report_lines(self):
+        """Rapport lisible, une ligne par étape / compteur (journal de l'interface)"""
+        lines = ["Durées par étape:"]
+        for stage, (seconds, calls) in sorted(self.stages.items(), key=lambda item: item[1][0], reverse=True):
+            lines.append(f"  {stage}: {seconds:.3f} s ({calls} appels)")
+        if self.counters:
+            lines.append("Compteurs: " + ", ".join(f"{name}={value}" for name, value in sorted(self.counters.items())))
+        slowest = self.slowest_pages()
+        if slowest:
+            lines.append("Pages les plus longues: " + ", ".join(f"{page + 1} ({seconds:.3f} s)" for page, seconds in slowest))
+        if 'memory' in self.extra:
+            lines.append(f"Pic mémoire Python: {self.extra['memory']['peak_bytes'] / 1024 / 1024:.1f} Mo")
+        if 'profile' in self.extra:
+            lines.append("Profil (fonctions les plus coûteuses, temps cumulé):")
+            lines.extend(f"  {line}" for line in self.extra['profile'])
+        return lines
+
+    def write_report(self, path, **info):
+        """Écrire le rapport JSON (info: champs ajoutés en tête, ex. pdf et output)"""
+        report = dict(info, metrics=self.to_dict())
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path
+
+
+def report_path_for(output_path):
+    """Chemin du rapport de performance d'un PDF annoté"""
+    return os.path.splitext(output_path)[0] + ".perf.json"
+
+
+@contextmanager
+def profiling(metrics, cprofile=False, trace_memory=False, profile_path=None, top=15):
+    """
+    Profiler le bloc with: fonctions les plus coûteuses (cProfile) et pic mémoire
+    (tracemalloc), ajoutés au rapport de metrics
+
+    cProfile ne mesure que le thread courant, et aucun des deux ne suit les processus
+    de travail (workers > 1). profile_path enregistre les statistiques complètes
+    (lisibles avec pstats ou snakeviz).
+    """
+    profiler = cProfile.Profile() if cprofile else None
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    if trace_memory:
+        tracemalloc.reset_peak()
+    if profiler:
+        profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler:
+            profiler.disable()
+            if profile_path:
+                profiler.dump_stats(profile_path)
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(top)
+            # Garder le tableau (en-tête ncalls et lignes suivantes)
+            lines = stream.getvalue().splitlines()
+            header = next((i for i, line in enumerate(lines) if line.lstrip().startswith("ncalls")), len(lines))
+            metrics.extra['profile'] = [line.rstrip() for line in lines[header:] if line.strip()]
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            metrics.extra['memory'] = {'current_bytes': current, 'peak_bytes': peak}
@@ -0,0 +1,273 @@
+"""
+File de traitements de l'interface: plusieurs paires Excel / PDF traitées par un groupe
+de processus, avec annulation et suivi page par page
+
+Les traitements s'exécutent dans des processus séparés (PyMuPDF ne peut pas être utilisé
+par plusieurs threads à la fois). Ils ne touchent jamais à l'interface: journal,
+progression et fin de traitement sont envoyés comme événements (job_id, type, données)
+dans JobQueue.events, que l'interface relit dans sa boucle Tk (after()) avec poll().
+
+Types d'événements:
+- 'started': None;
+- 'progress': (étape, page, nombre de pages), page comptée à partir de 1;
+- 'log': message du journal;
+- 'done': chemin du rapport de performance;
+- 'error': message d'erreur;
+- 'cancelled': None.
+
+L'annulation d'un traitement en cours prend effet à la page suivante: le PDF annoté
+n'est alors pas enregistré.
+
+Ce module n'importe pas pandas ni PyMuPDF (imports différés, voir startup.py): les
+processus de travail les chargent à leur démarrage (JobQueue.start).
+"""
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ProcessPoolExecutor
+
+from excel_cache import DEFAULT_CACHE_DIR, WireListCache
+from incremental import process_pdf_incremental
+from instrumentation import Metrics, profiling, report_path_for
+from processing import (SAVE_DEFAULT, add_annotations_to_pdf, extract_circuit_numbers, match_with_wire_list,
+                        process_pdf_streaming)
+from startup import preload
+
+# Modes de traitement proposés dans l'interface
+MODE_STANDARD = "Complet"
+MODE_STREAMING = "Page par page"
+MODE_INCREMENTAL = "Pages modifiées"
+MODES = (MODE_STANDARD, MODE_STREAMING, MODE_INCREMENTAL)
+
+# Étapes affichées par la barre de progression
+STAGE_EXTRACTION = "Extraction"
+STAGE_ANNOTATION = "Annotation"
+STAGE_PAGES = "Pages"
+
+# Listes de fils lues une seule fois par processus (voir _init_worker)
+_wire_list_cache = None
+
+
+class JobCancelled(Exception):
+    """Traitement annulé depuis l'interface"""
+
+
+class Job:
+    """
+    Paramètres d'un traitement, transmis au processus de travail
+    """
+    def __init__(self, job_id, excel_path, pdf_path, output_path, sheet_name=None, grammar=None,
+                 mode=MODE_STANDARD, save_mode=SAVE_DEFAULT, profile=False,
+                 circuit_col="Wire Internal Name", sn_col="SN FILS SIMPLE", workers=1, avoid_overlaps=True):
+        if mode not in MODES:
+            raise ValueError(f"Mode de traitement inconnu: {mode}. Modes disponibles: {', '.join(MODES)}")
+        self.job_id = job_id
+        self.excel_path = excel_path
+        self.pdf_path = pdf_path
+        self.output_path = output_path
+        self.sheet_name = sheet_name
+        self.grammar = grammar
+        self.mode = mode
+        self.save_mode = save_mode
+        self.profile = profile
+        self.circuit_col = circuit_col
+        self.sn_col = sn_col
+        self.workers = workers
+        self.avoid_overlaps = avoid_overlaps
+
+    def __repr__(self):
+        return f"Job({self.job_id}, {self.pdf_path!r})"
+
+
+def _init_worker(cache_dir):
+    global _wire_list_cache
+    _wire_list_cache = WireListCache(cache_dir)
+    preload()
+
+
+def _ready():
+    """Tâche vide: démarrer un processus de travail (voir JobQueue.start)"""
+
+
+def run_pipeline(job, metrics, log, progress):
+    """
+    Extraction, correspondance et annotation selon le mode du traitement, mesurées dans metrics
+
+    progress(étape) retourne le rappel progress(page_num, page_count, page_circuits) d'une étape.
+    """
+    wire_list = _wire_list_cache.load(job.excel_path, job.circuit_col, job.sn_col, sheet_name=job.sheet_name,
+                                      grammar=job.grammar, metrics=metrics)
+    log(_wire_list_cache.stats_line())
+
+    if job.mode == MODE_STREAMING:
+        # Extraction, correspondance et annotation page par page
+        log(f"Traitement page par page de {job.pdf_path}...")
+        process_pdf_streaming(job.pdf_path, job.output_path, wire_list, job.circuit_col, job.sn_col,
+                              progress=progress(STAGE_PAGES), grammar=job.grammar, metrics=metrics,
+                              save_mode=job.save_mode, avoid_overlaps=job.avoid_overlaps)
+    elif job.mode == MODE_INCREMENTAL:
+        # Ne retraiter que les pages et circuits modifiés depuis le dernier passage
+        log("Traitement incrémental des pages modifiées...")
+        process_pdf_incremental(job.pdf_path, job.output_path, wire_list, job.circuit_col, job.sn_col, log=log,
+                                grammar=job.grammar, metrics=metrics, save_mode=job.save_mode,
+                                progress=progress(STAGE_PAGES), avoid_overlaps=job.avoid_overlaps)
+    else:
+        log(f"Extraction des numéros de circuit du fichier {job.pdf_path}...")
+        with metrics.timer('extraction'):
+            circuit_info = extract_circuit_numbers(job.pdf_path, workers=job.workers, grammar=job.grammar,
+                                                   metrics=metrics, progress=progress(STAGE_EXTRACTION))
+        log(f"{len(circuit_info)} numéros de circuit trouvés "
+            f"({metrics.counters.get('circuits_skipped', 0)} circuits de joints ignorés).")
+
+        log(f"Recherche des correspondances dans {job.excel_path}...")
+        matched_info = match_with_wire_list(circuit_info, wire_list, job.circuit_col, job.sn_col, metrics=metrics)
+
+        log("Ajout des annotations au PDF...")
+        with metrics.timer('annotation'):
+            add_annotations_to_pdf(job.pdf_path, job.output_path, matched_info, metrics=metrics,
+                                   save_mode=job.save_mode, progress=progress(STAGE_ANNOTATION),
+                                   avoid_overlaps=job.avoid_overlaps)
+
+
+def run_job(job, events, cancelled):
+    """
+    Exécuter un traitement dans le processus de travail, en envoyant ses événements dans events
+
+    cancelled est le dictionnaire partagé des traitements annulés (job_id -> True).
+    """
+    def post(kind, data=None):
+        events.put((job.job_id, kind, data))
+
+    def progress(stage):
+        def callback(page_num, page_count, page_circuits):
+            if job.job_id in cancelled:
+                raise JobCancelled()
+            post('progress', (stage, page_num + 1, page_count))
+        return callback
+
+    if job.job_id in cancelled:
+        post('cancelled')
+        return
+    post('started')
+    try:
+        post('log', "Démarrage du traitement...")
+        metrics = Metrics()
+        with profiling(metrics, cprofile=job.profile, trace_memory=job.profile):
+            run_pipeline(job, metrics, lambda message: post('log', message), progress)
+
+        # Rapport de performance: journal et fichier JSON à côté du résultat
+        for line in metrics.report_lines():
+            post('log', line)
+        report_path = metrics.write_report(report_path_for(job.output_path), pdf=job.pdf_path,
+                                           output=job.output_path, mode=job.mode)
+        post('log', f"Rapport de performance: {report_path}")
+        post('done', report_path)
+    except JobCancelled:
+        post('cancelled')
+    except Exception as e:
+        post('error', str(e))
+
+
+class JobQueue:
+    """
+    Traitements en attente et en cours, exécutés par un groupe de processus
+
+    Le groupe de processus (et le gestionnaire des événements partagés) est démarré par
+    start(), ou au premier traitement ajouté.
+    """
+    def __init__(self, workers=2, cache_dir=DEFAULT_CACHE_DIR):
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.jobs = {}
+        self.events = None
+        self._manager = None
+        self._cancelled = None
+        self._executor = None
+        self._futures = {}
+        self._next_id = 1
+
+    def start(self):
+        """Démarrer les processus de travail, qui chargent aussitôt les modules lourds"""
+        if self._executor is not None:
+            return
+        self._manager = multiprocessing.Manager()
+        self.events = self._manager.Queue()
+        self._cancelled = self._manager.dict()
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(self.cache_dir,))
+        # Un processus est lancé par tâche en attente, jusqu'à workers
+        for _ in range(self.workers):
+            self._executor.submit(_ready)
+
+    def active_job_for(self, output_path):
+        """Traitement en attente ou en cours qui écrit output_path, ou None"""
+        key = os.path.normcase(os.path.abspath(output_path))
+        for job_id, future in self._futures.items():
+            job = self.jobs[job_id]
+            if not future.done() and os.path.normcase(os.path.abspath(job.output_path)) == key:
+                return job
+        return None
+
+    def submit(self, excel_path, pdf_path, output_path, **options):
+        """
+        Ajouter un traitement à la file et retourner son Job
+
+        Lève ValueError si un traitement en attente ou en cours écrit déjà output_path:
+        les deux écriraient en même temps le PDF annoté, sa copie de travail, son
+        manifeste et son rapport.
+        """
+        active = self.active_job_for(output_path)
+        if active is not None:
+            raise ValueError(f"Le traitement {active.job_id} ({active.pdf_path}) écrit déjà {output_path}")
+        self.start()
+        job = Job(self._next_id, excel_path, pdf_path, output_path, **options)
+        self._next_id += 1
+        self.jobs[job.job_id] = job
+        future = self._executor.submit(run_job, job, self.events, self._cancelled)
+        # Erreur hors du traitement lui-même (processus de travail arrêté...)
+        future.add_done_callback(lambda future: self._report_failure(job, future))
+        self._futures[job.job_id] = future
+        return job
+
+    def _report_failure(self, job, future):
+        if not future.cancelled() and future.exception() is not None:
+            self.events.put((job.job_id, 'error', str(future.exception())))
+
+    def cancel(self, job_id):
+        """Annuler un traitement: retiré de la file s'il n'a pas démarré, arrêté à la page suivante sinon"""
+        future = self._futures.get(job_id)
+        if future is None or future.done():
+            return
+        if future.cancel():
+            self.events.put((job_id, 'cancelled', None))
+        else:
+            self._cancelled[job_id] = True
+
+    def cancel_all(self):
+        for job_id in list(self._futures):
+            self.cancel(job_id)
+
+    def pending(self):
+        """Nombre de traitements en attente ou en cours"""
+        return sum(not future.done() for future in self._futures.values())
+
+    def poll(self, limit=500):
+        """Événements reçus depuis le dernier appel (sans attendre), au plus limit"""
+        received = []
+        if self.events is None:
+            return received
+        while len(received) < limit:
+            try:
+                received.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return received
+
+    def shutdown(self):
+        """Annuler les traitements et arrêter les processus"""
+        if self._executor is None:
+            return
+        self.cancel_all()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._manager.shutdown()
+        self._executor = None
@@ -0,0 +1,169 @@
+"""
+Grammaires des plans de câblage: motifs des circuits, joints et part numbers
+
+Les grammaires sont décrites dans patterns.json (une par format de plan client) et
+compilées une seule fois au premier appel de get_grammar(). Exemple d'entrée:
+
+    "yazaki": {
+        "description": "Libellés 7/W0007,... et J+12",
+        "joint": ["J\\d+\\s*\\n(\\d+)"],
+        "circuit": ["(\\d+)/W\\d+,", "J\\+(\\d+)\\b"],
+        "part_number": ["\\b\\d+[A-Z]\\b"],
+        "part_number_column": "\\d+[A-Z]"
+    }
+
+- joint: le premier groupe capturé est un circuit à ignorer;
+- circuit: le premier groupe capturé est le numéro de circuit, la correspondance complète
+  est le texte annoté;
+- part_number: la correspondance complète est un part number de la page;
+- part_number_column: forme des en-têtes des colonnes part number de la liste de fils.
+
+Tous les motifs d'une page sont évalués en un seul passage (une alternance compilée), avec
+le même résultat que des recherches séparées par type: les correspondances d'un même type
+ne se chevauchent pas, celles de types différents le peuvent. Seule exception: si deux
+types correspondent à partir du même caractère, les joints passent avant les circuits,
+eux-mêmes avant les part numbers. Les motifs ne doivent pas utiliser de références
+arrière numérotées (\\1).
+"""
+import hashlib
+import json
+import os
+import re
+
+DEFAULT_PATTERNS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "patterns.json")
+
+# Grammaire utilisée si patterns.json est absent (motifs d'origine de l'application)
+DEFAULT_GRAMMAR_NAME = "yazaki"
+DEFAULT_GRAMMAR = {
+    'description': "Libellés 7/W0007,... et J+12, joints J3 suivis du circuit",
+    'joint': [r'J\d+\s*\n(\d+)'],
+    'circuit': [r'(\d+)/W\d+,', r'J\+(\d+)\b'],
+    'part_number': [r'\b\d+[A-Z]\b'],
+    'part_number_column': r'\d+[A-Z]',
+}
+
+
+class Grammar:
+    """
+    Motifs compilés d'un format de plan
+    """
+    # Ordre de priorité dans l'alternance
+    KINDS = ('joint', 'circuit', 'part_number')
+
+    def __init__(self, name, definition):
+        self.name = name
+        self.description = definition.get('description', "")
+        self.patterns = {kind: tuple(definition.get(kind, ())) for kind in self.KINDS}
+        self.part_number_column = re.compile(definition.get('part_number_column', DEFAULT_GRAMMAR['part_number_column']))
+
+        # Une alternance unique, sans largeur (?=(motif1)|(motif2)|...): le moteur essaie chaque
+        # position du texte, et l'indice du groupe englobant (match.lastindex) indique le type
+        alternatives = []
+        self._groups = {}
+        group = 1
+        for kind in self.KINDS:
+            for pattern in self.patterns[kind]:
+                try:
+                    compiled = re.compile(pattern)
+                except re.error as e:
+                    raise ValueError(f"Grammaire '{name}': motif {kind} invalide {pattern!r} ({e})") from e
+                if kind != 'part_number' and compiled.groups == 0:
+                    raise ValueError(f"Grammaire '{name}': le motif {kind} {pattern!r} doit capturer le numéro de circuit")
+                self._groups[group] = (kind, group + 1, group + 1 + compiled.groups)
+                alternatives.append(f"({pattern})")
+                group += compiled.groups + 1
+        if not self.patterns['circuit']:
+            raise ValueError(f"Grammaire '{name}': aucun motif de circuit")
+        self.regex = re.compile("(?=" + "|".join(alternatives) + ")")
+
+        # Joints seuls, pour le relevé rapide du traitement page par page
+        self.joint_regex = re.compile("|".join(f"(?:{pattern})" for pattern in self.patterns['joint']) or r'(?!)')
+
+    def scan(self, text):
+        """
+        Parcourir le texte une seule fois: générateur de (type, valeur, début, fin)
+        """
+        groups = self._groups
+        # Fin de la dernière correspondance retenue, par type (pas de chevauchement dans un type)
+        ends = dict.fromkeys(self.KINDS, 0)
+        for match in self.regex.finditer(text):
+            outer = match.lastindex
+            kind, first, last = groups[outer]
+            start, end = match.span(outer)
+            if start < ends[kind]:
+                continue
+            ends[kind] = end
+            if kind == 'part_number':
+                yield kind, match.group(outer), start, end
+                continue
+            for index in range(first, last):
+                value = match.group(index)
+                if value is not None:
+                    yield kind, value, start, end
+                    break
+
+    def joint_circuits(self, text):
+        """Circuits associés à un joint dans le texte"""
+        circuits = set()
+        for match in self.joint_regex.finditer(text):
+            value = next((group for group in match.groups() if group is not None), None)
+            if value is not None:
+                circuits.add(value)
+        return circuits
+
+    def fingerprint(self):
+        """Empreinte des motifs (invalidation des manifestes et des caches)"""
+        definition = dict(self.patterns, part_number_column=self.part_number_column.pattern)
+        return hashlib.sha1(json.dumps(definition, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def __repr__(self):
+        return f"Grammar({self.name!r})"
+
+
+class PatternRegistry:
+    """
+    Grammaires disponibles, par nom
+    """
+    def __init__(self, grammars, default=None):
+        if not grammars:
+            raise ValueError("Aucune grammaire définie")
+        self.grammars = grammars
+        self.default = default if default is not None else next(iter(grammars))
+        if self.default not in grammars:
+            raise ValueError(f"Grammaire par défaut '{self.default}' introuvable. "
+                             f"Grammaires disponibles: {', '.join(grammars)}")
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_PATTERNS_PATH):
+        """Lire et compiler les grammaires d'un fichier JSON (grammaire d'origine si absent)"""
+        if not os.path.exists(path):
+            return cls({DEFAULT_GRAMMAR_NAME: Grammar(DEFAULT_GRAMMAR_NAME, DEFAULT_GRAMMAR)})
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        grammars = {name: Grammar(name, definition) for name, definition in config.get('grammars', {}).items()}
+        return cls(grammars, config.get('default'))
+
+    def names(self):
+        return list(self.grammars)
+
+    def get(self, name=None):
+        if name is None:
+            name = self.default
+        if name not in self.grammars:
+            raise ValueError(f"Grammaire '{name}' introuvable. Grammaires disponibles: {', '.join(self.grammars)}")
+        return self.grammars[name]
+
+
+# Registres déjà compilés, par fichier
+_registries = {}
+
+def get_registry(path=None):
+    """Registre des grammaires, compilé au premier appel"""
+    path = os.path.abspath(path or DEFAULT_PATTERNS_PATH)
+    if path not in _registries:
+        _registries[path] = PatternRegistry.from_file(path)
+    return _registries[path]
+
+def get_grammar(name=None, path=None):
+    """Grammaire compilée par son nom (grammaire par défaut du registre si None)"""
+    return get_registry(path).get(name)
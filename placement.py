@@ -0,0 +1,288 @@
+"""
+Placement des annotations sans chevauchement
+
+La position d'origine d'une annotation (décalage fixe selon la rotation et le côté du
+circuit, voir _annotate_page) est conservée si elle est libre. Sinon l'annotation est
+déplacée vers la position libre la plus proche parmi des positions candidates autour
+de celle d'origine: décalages le long du texte, puis perpendiculaires (demi-lignes).
+
+Une position est libre si la boîte de l'annotation reste sur la page et ne recouvre:
+- ni le texte de la page (boîtes de get_bboxlog), ni une annotation déjà placée: obligatoire;
+- ni un tracé (segments de get_cdrawings): préféré, abandonné si aucune position ne le permet.
+Si aucune position ne convient, l'annotation reste à sa position d'origine.
+
+Index spatiaux d'une page:
+- texte et tracés (fixes): grilles d'occupation (cellules de CELL_SIZE points) avec table
+  des sommes cumulées, une boîte est testée en temps constant et toutes les positions
+  candidates d'une annotation en une seule opération numpy;
+- annotations placées: grille de rectangles (SpatialGrid), complétée au fur et à mesure.
+Le coût d'une page reste ainsi proportionnel au nombre d'annotations et de tracés.
+
+Toutes les coordonnées sont celles de la page non tournée (celles de l'extraction et de
+page.insert_text).
+"""
+import math
+
+from startup import lazy_import
+
+fitz = lazy_import("fitz")  # PyMuPDF
+np = lazy_import("numpy")
+
+# Côté des cellules des grilles d'occupation (points)
+CELL_SIZE = 2.0
+
+# Côté des cellules de la grille des annotations placées (points)
+LABEL_CELL_SIZE = 48.0
+
+# Boîte d'une annotation autour de la ligne de base, en fraction de la taille de police
+# (hauteur des chiffres et majuscules de Helvetica), et marge autour (points)
+LABEL_ASCENT = 0.75
+LABEL_DESCENT = 0.05
+LABEL_MARGIN = 1.0
+
+# Positions candidates: pas en tailles de police le long du texte et perpendiculairement,
+# et poids de l'écart perpendiculaire (une annotation qui reste sur la ligne du circuit
+# est préférée)
+ALONG_STEPS = 6
+ACROSS_STEPS = 6
+ACROSS_STEP = 0.5
+ACROSS_WEIGHT = 2.0
+
+# Direction du texte (u) et direction "vers le bas" de l'annotation (v) selon la rotation
+# de la page (texte écrit avec rotate=rotation)
+DIRECTIONS = {
+    0: ((1.0, 0.0), (0.0, 1.0)),
+    90: ((0.0, -1.0), (1.0, 0.0)),
+    180: ((-1.0, 0.0), (0.0, -1.0)),
+    270: ((0.0, 1.0), (-1.0, 0.0)),
+}
+
+
+def candidate_offsets(fontsize):
+    """Décalages (le long du texte, perpendiculaire) des positions candidates, du plus proche au plus éloigné"""
+    offsets = [
+        (along * fontsize, across * ACROSS_STEP * fontsize)
+        for along in range(-ALONG_STEPS, ALONG_STEPS + 1)
+        for across in range(-ACROSS_STEPS, ACROSS_STEPS + 1)
+    ]
+    offsets.sort(key=lambda offset: (offset[0] ** 2 + (ACROSS_WEIGHT * offset[1]) ** 2, offset))
+    return np.array(offsets)
+
+
+class OccupancyGrid:
+    """
+    Cellules d'une page recouvertes par des rectangles ou des segments
+    """
+    def __init__(self, width, height, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cols = int(math.ceil(width / cell_size)) + 1
+        self.rows = int(math.ceil(height / cell_size)) + 1
+        self.cells = np.zeros((self.rows, self.cols), dtype=bool)
+        self._sums = None
+
+    def _column(self, x):
+        return min(max(int(x // self.cell_size), 0), self.cols - 1)
+
+    def _row(self, y):
+        return min(max(int(y // self.cell_size), 0), self.rows - 1)
+
+    def add_rect(self, x0, y0, x1, y1):
+        self.cells[self._row(y0):self._row(y1) + 1, self._column(x0):self._column(x1) + 1] = True
+        self._sums = None
+
+    def add_segments(self, segments):
+        """Marquer les cellules traversées par des segments (tableau de x0, y0, x1, y1)"""
+        # En unités de cellule: un point échantillonné par cellule le long de chaque segment
+        segments = np.asarray(segments, dtype=np.float32).reshape(-1, 4) / self.cell_size
+        if not len(segments):
+            return
+        start, delta = segments[:, :2], segments[:, 2:] - segments[:, :2]
+        steps = np.hypot(delta[:, 0], delta[:, 1]).astype(np.int32) + 1
+        segment_index = np.repeat(np.arange(len(segments), dtype=np.int32), steps + 1)
+        first_point = np.repeat(np.cumsum(steps + 1) - (steps + 1), steps + 1)
+        t = (np.arange(len(segment_index), dtype=np.int32) - first_point) / steps[segment_index].astype(np.float32)
+        columns = (start[segment_index, 0] + t * delta[segment_index, 0]).astype(np.int32)
+        rows = (start[segment_index, 1] + t * delta[segment_index, 1]).astype(np.int32)
+        on_page = (columns >= 0) & (columns < self.cols) & (rows >= 0) & (rows < self.rows)
+        self.cells[rows[on_page], columns[on_page]] = True
+        self._sums = None
+
+    def cell_ranges(self, boxes):
+        """Cellules recouvertes par chaque boîte (tableau de x0, y0, x1, y1): colonnes et lignes [début, fin)"""
+        ranges = (boxes // self.cell_size).astype(np.int32)
+        ranges[:, 2:] += 1
+        np.maximum(ranges, 0, out=ranges)
+        np.minimum(ranges[:, 0::2], self.cols, out=ranges[:, 0::2])
+        np.minimum(ranges[:, 1::2], self.rows, out=ranges[:, 1::2])
+        return ranges
+
+    def _summed(self):
+        """Table des sommes cumulées: nombre de cellules marquées dans [0, ligne) x [0, colonne)"""
+        if self._sums is None:
+            self._sums = np.zeros((self.rows + 1, self.cols + 1), dtype=np.int32)
+            self._sums[1:, 1:] = self.cells.cumsum(axis=0, dtype=np.int32).cumsum(axis=1, dtype=np.int32)
+        return self._sums
+
+    def occupied(self, ranges):
+        """Pour chaque plage de cellules (voir cell_ranges): True si elle contient une cellule marquée"""
+        c0, r0, c1, r1 = ranges.T
+        sums = self._summed()
+        return (sums[r1, c1] - sums[r0, c1] - sums[r1, c0] + sums[r0, c0]) > 0
+
+    def box_occupied(self, box):
+        """True si la boîte (x0, y0, x1, y1) recouvre une cellule marquée (une seule boîte, sans numpy)"""
+        x0, y0, x1, y1 = box
+        c0, r0 = self._column(x0), self._row(y0)
+        c1, r1 = self._column(x1) + 1, self._row(y1) + 1
+        sums = self._summed()
+        return int(sums[r1, c1]) - int(sums[r0, c1]) - int(sums[r1, c0]) + int(sums[r0, c0]) > 0
+
+
+class SpatialGrid:
+    """
+    Rectangles rangés par cellule: une requête ne teste que les rectangles des cellules
+    qu'elle recouvre
+    """
+    def __init__(self, cell_size=LABEL_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = {}
+
+    def _keys(self, rect):
+        x0, y0, x1, y1 = rect
+        size = self.cell_size
+        for column in range(int(x0 // size), int(x1 // size) + 1):
+            for row in range(int(y0 // size), int(y1 // size) + 1):
+                yield column, row
+
+    def insert(self, rect):
+        for key in self._keys(rect):
+            self._cells.setdefault(key, []).append(rect)
+
+    def intersects(self, rect):
+        x0, y0, x1, y1 = rect
+        for key in self._keys(rect):
+            for other in self._cells.get(key, ()):
+                if other[0] < x1 and x0 < other[2] and other[1] < y1 and y0 < other[3]:
+                    return True
+        return False
+
+
+def _drawing_segments(page):
+    """Segments des tracés de la page: lignes, polygones de contrôle des courbes, côtés des rectangles"""
+    segments = []
+    for path in page.get_cdrawings():
+        for item in path['items']:
+            kind = item[0]
+            if kind == 'l' or kind == 'c':
+                points = item[1:]
+            elif kind == 're':
+                x0, y0, x1, y1 = item[1]
+                points = ((x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0))
+            elif kind == 'qu':
+                ul, ur, ll, lr = item[1]
+                points = (ul, ur, lr, ll, ul)
+            else:
+                continue
+            for (xa, ya), (xb, yb) in zip(points, points[1:]):
+                segments.append((xa, ya, xb, yb))
+    return segments
+
+
+class LabelPlacer:
+    """
+    Choix des positions des annotations d'une page, dans l'ordre où elles sont placées
+    """
+    def __init__(self, page, fontsize=10, fontname="helv"):
+        self.fontsize = fontsize
+        self.fontname = fontname
+        self._advances = {}
+        # Dimensions de la page non tournée
+        self.width = page.cropbox.width
+        self.height = page.cropbox.height
+
+        self.text = OccupancyGrid(self.width, self.height)
+        for kind, bbox in page.get_bboxlog():
+            if kind in ('fill-text', 'stroke-text'):
+                self.text.add_rect(*bbox)
+        self.drawings = OccupancyGrid(self.width, self.height)
+        self.drawings.add_segments(_drawing_segments(page))
+
+        self.labels = SpatialGrid()
+        self.offsets = candidate_offsets(fontsize)
+        self.moved = 0
+        self.unresolved = 0
+
+    def text_width(self, text):
+        """Largeur du texte: fitz.get_text_length, mis en cache par caractère (pas de crénage)"""
+        advances = self._advances
+        width = 0.0
+        for char in text:
+            advance = advances.get(char)
+            if advance is None:
+                advance = advances[char] = fitz.get_text_length(char, self.fontname, self.fontsize)
+            width += advance
+        return width
+
+    def _extent(self, width, rotation):
+        """Boîte (avec marge) d'une annotation de largeur width, relative à son point d'insertion"""
+        (ux, uy), (vx, vy) = DIRECTIONS[rotation]
+        # Coins de la boîte: ligne de base [0, width] le long de u, [-ascent, descent] le long de v
+        corners = [(along * ux + across * vx, along * uy + across * vy)
+                   for along in (0.0, width)
+                   for across in (-LABEL_ASCENT * self.fontsize, LABEL_DESCENT * self.fontsize)]
+        xs = [x for x, _ in corners]
+        ys = [y for _, y in corners]
+        return (min(xs) - LABEL_MARGIN, min(ys) - LABEL_MARGIN, max(xs) + LABEL_MARGIN, max(ys) + LABEL_MARGIN)
+
+    def _boxes(self, points, width, rotation):
+        """Boîtes (avec marge) d'une annotation de largeur width écrite à chaque point"""
+        extent = np.array(self._extent(width, rotation))
+        return np.concatenate((points, points), axis=1) + extent
+
+    def _free(self, box):
+        """Position d'origine: sur la page, libre de texte, de tracés et d'annotations"""
+        x0, y0, x1, y1 = box
+        return (x0 >= 0 and y0 >= 0 and x1 <= self.width and y1 <= self.height
+                and not self.text.box_occupied(box) and not self.drawings.box_occupied(box)
+                and not self.labels.intersects(box))
+
+    def place(self, point, text, rotation):
+        """Position retenue (fitz.Point) pour l'annotation text prévue à point"""
+        if rotation not in DIRECTIONS:
+            return point
+        width = self.text_width(text)
+
+        # Cas courant: la position d'origine est libre (test sans numpy)
+        x0, y0, x1, y1 = self._extent(width, rotation)
+        box = (point.x + x0, point.y + y0, point.x + x1, point.y + y1)
+        if self._free(box):
+            self.labels.insert(box)
+            return point
+
+        (ux, uy), (vx, vy) = DIRECTIONS[rotation]
+        points = np.empty((len(self.offsets), 2))
+        points[:, 0] = point.x + self.offsets[:, 0] * ux + self.offsets[:, 1] * vx
+        points[:, 1] = point.y + self.offsets[:, 0] * uy + self.offsets[:, 1] * vy
+        boxes = self._boxes(points, width, rotation)
+
+        # Les positions retenues doivent rester sur la page (la grille ne couvre pas l'extérieur)
+        inside = ((boxes[:, 0] >= 0) & (boxes[:, 1] >= 0)
+                  & (boxes[:, 2] <= self.width) & (boxes[:, 3] <= self.height))
+        # Même grille pour le texte et les tracés: plages de cellules calculées une fois
+        ranges = self.text.cell_ranges(boxes)
+        free_text = inside & ~self.text.occupied(ranges)
+        free_drawings = ~self.drawings.occupied(ranges)
+
+        chosen = None
+        for candidates in (np.flatnonzero(free_text & free_drawings), np.flatnonzero(free_text)):
+            chosen = next((index for index in candidates if not self.labels.intersects(boxes[index])), None)
+            if chosen is not None:
+                break
+        if chosen is None:
+            chosen = 0
+            self.unresolved += 1
+        elif chosen != 0:
+            self.moved += 1
+
+        self.labels.insert(tuple(boxes[chosen]))
+        return fitz.Point(*points[chosen])
@@ -0,0 +1,256 @@
+"""
+Aperçu du PDF annoté dans l'application: miniatures des pages rendues à la demande, en
+arrière-plan, et accès direct aux circuits "Non trouvé" du rapport du traitement
+
+Le rendu s'exécute dans un seul thread dédié (PreviewRenderer), propriétaire du document
+ouvert: PyMuPDF ne peut pas être utilisé par plusieurs threads à la fois. Les pages
+demandées sont rendues dans l'ordre donné (pages visibles, puis leurs voisines, voir
+priority_order); une nouvelle demande remplace la précédente, si bien que le défilement
+d'un plan de plusieurs centaines de pages ne laisse pas s'accumuler de rendus inutiles.
+
+Les circuits "Non trouvé" viennent du rapport du traitement (.perf.json, voir
+processing.record_not_found et load_not_found), et non d'une recherche dans le PDF
+rendu: une annotation placée hors de la page, ou un texte "Non trouvé" déjà présent
+sur le plan, fausserait la liste.
+
+Comme pour la file des traitements (jobs.py), le thread ne touche jamais à l'interface:
+ses résultats sont envoyés comme événements (document, type, données) dans
+PreviewRenderer.events, que l'interface relit dans sa boucle Tk (after()) avec poll().
+
+Types d'événements:
+- 'opened': tailles des pages affichées (largeur, hauteur) en points;
+- 'page': (page, image PIL de la miniature);
+- 'not_found': liste de (page, rectangle) des circuits "Non trouvé", en points de la page
+  affichée (rotation appliquée), dans l'ordre des pages;
+- 'error': message d'erreur.
+
+Les miniatures sont gardées dans un cache LRU borné en mémoire (ThumbnailCache), utilisé
+par le seul thread de l'interface.
+"""
+import json
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from startup import lazy_import
+
+fitz = lazy_import("fitz")  # PyMuPDF, chargé par le thread de rendu
+
+# Largeur des miniatures (pixels): assez pour lire les numéros SN d'un plan A3
+THUMBNAIL_WIDTH = 560
+
+# Mémoire maximale des miniatures gardées en cache (octets)
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+# Pages voisines des pages visibles rendues à l'avance, de chaque côté
+PREFETCH_PAGES = 4
+
+
+def document_key(path):
+    """Clé d'un fichier dans le cache: un fichier réécrit (nouveau traitement) ne réutilise pas les anciennes miniatures"""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def load_not_found(report_path):
+    """
+    Circuits "Non trouvé" du rapport d'un traitement (voir processing.record_not_found):
+    liste de (page, rectangle dans la page non tournée), dans l'ordre des pages
+
+    Lève OSError, ValueError ou KeyError si le rapport est absent ou illisible.
+    """
+    with open(report_path, encoding="utf-8") as f:
+        report = json.load(f)
+    entries = report['metrics'].get('not_found', [])
+    return sorted((entry['page'], tuple(entry['rect'])) for entry in entries)
+
+
+def priority_order(first_visible, last_visible, page_count, prefetch=PREFETCH_PAGES):
+    """Pages dans l'ordre de rendu: pages visibles, puis voisines alternativement après et avant"""
+    order = list(range(first_visible, last_visible + 1))
+    for distance in range(1, prefetch + 1):
+        for page_num in (last_visible + distance, first_visible - distance):
+            if 0 <= page_num < page_count:
+                order.append(page_num)
+    return order
+
+
+class ThumbnailCache:
+    """
+    Miniatures rendues, les moins récemment utilisées retirées au-delà de max_bytes
+
+    Clés: (document_key(chemin), numéro de page). Non protégé pour plusieurs threads:
+    utilisé par le seul thread de l'interface.
+    """
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._images = OrderedDict()
+
+    @staticmethod
+    def image_bytes(image):
+        return image.width * image.height * len(image.getbands())
+
+    def __contains__(self, key):
+        return key in self._images
+
+    def __len__(self):
+        return len(self._images)
+
+    def get(self, key):
+        """Miniature en cache (devient la plus récemment utilisée), ou None"""
+        image = self._images.get(key)
+        if image is None:
+            self.misses += 1
+            return None
+        self._images.move_to_end(key)
+        self.hits += 1
+        return image
+
+    def put(self, key, image):
+        if key in self._images:
+            self.bytes -= self.image_bytes(self._images.pop(key))
+        self._images[key] = image
+        self.bytes += self.image_bytes(image)
+        # La miniature ajoutée reste en cache même si elle dépasse à elle seule la limite
+        while self.bytes > self.max_bytes and len(self._images) > 1:
+            _, evicted = self._images.popitem(last=False)
+            self.bytes -= self.image_bytes(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self._images.clear()
+        self.bytes = 0
+
+    def stats_line(self):
+        return (f"Cache des miniatures: {len(self._images)} pages, {self.bytes / 1024 / 1024:.1f} Mo "
+                f"sur {self.max_bytes / 1024 / 1024:.0f} Mo, {self.hits} réutilisées, "
+                f"{self.evictions} retirées")
+
+
+class PreviewRenderer:
+    """
+    Thread de rendu des miniatures d'un document, démarré à la première ouverture
+
+    open() change de document, request() remplace les pages à rendre; les résultats sont
+    lus avec poll(). Un seul PreviewRenderer par processus (PyMuPDF).
+    """
+    def __init__(self, width=THUMBNAIL_WIDTH):
+        self.width = width
+        self.events = queue.Queue()
+        self._condition = threading.Condition()
+        self._document_id = 0
+        self._path = None
+        self._not_found = []
+        self._pending = []
+        self._stopped = False
+        self._thread = None
+
+    def open(self, path, not_found=()):
+        """
+        Ouvrir path dans le thread de rendu et retourner l'identifiant du document (voir poll)
+
+        not_found: circuits "Non trouvé" (voir load_not_found), renvoyés dans l'événement
+        'not_found' en coordonnées de la page affichée.
+        """
+        with self._condition:
+            self._document_id += 1
+            self._path = path
+            self._not_found = list(not_found)
+            self._pending = []
+            self._condition.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="preview-renderer", daemon=True)
+                self._thread.start()
+            return self._document_id
+
+    def close(self):
+        """Fermer le document ouvert (le fichier n'est plus verrouillé)"""
+        self.open(None)
+
+    def request(self, pages):
+        """Pages à rendre, dans l'ordre: remplace la demande précédente"""
+        with self._condition:
+            self._pending = list(pages)
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def poll(self, document_id, limit=50):
+        """Événements du document document_id reçus depuis le dernier appel, au plus limit (sans attendre)"""
+        received = []
+        while len(received) < limit:
+            try:
+                event_document, kind, data = self.events.get_nowait()
+            except queue.Empty:
+                break
+            # Résultats d'un document fermé depuis: ignorés
+            if event_document == document_id:
+                received.append((kind, data))
+        return received
+
+    def _next_task(self, document_id, doc):
+        """Prochaine tâche (document, (chemin, circuits non trouvés) à ouvrir, page à rendre), en attendant au besoin"""
+        with self._condition:
+            while True:
+                if self._stopped:
+                    return None
+                if self._document_id != document_id:
+                    return self._document_id, (self._path, self._not_found), None
+                if self._pending and doc is not None:
+                    return document_id, None, self._pending.pop(0)
+                self._condition.wait()
+
+    def _run(self):
+        document_id, doc = None, None
+        while True:
+            task = self._next_task(document_id, doc)
+            if task is None:
+                break
+            task_document, opening, page_num = task
+            if task_document != document_id:
+                # Nouveau document (ou fermeture: chemin None)
+                if doc is not None:
+                    doc.close()
+                    doc = None
+                document_id = task_document
+                path, not_found = opening
+                if path is not None:
+                    try:
+                        doc = fitz.open(path)
+                        self.events.put((document_id, 'opened',
+                                         [(page.rect.width, page.rect.height) for page in doc]))
+                        self.events.put((document_id, 'not_found', self._displayed_rects(doc, not_found)))
+                    except Exception as e:
+                        doc = None
+                        self.events.put((document_id, 'error', str(e)))
+            else:
+                try:
+                    self.events.put((document_id, 'page', (page_num, self._render(doc[page_num]))))
+                except Exception as e:
+                    self.events.put((document_id, 'error', f"Page {page_num + 1}: {e}"))
+        if doc is not None:
+            doc.close()
+
+    def _render(self, page):
+        zoom = self.width / page.rect.width
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+    @staticmethod
+    def _displayed_rects(doc, not_found):
+        """Rectangles de la page non tournée (extraction) ramenés à la page affichée (rotation)"""
+        return [(page_num, tuple(fitz.Rect(rect) * doc[page_num].rotation_matrix))
+                for page_num, rect in not_found if page_num < doc.page_count]
@@ -0,0 +1,886 @@
+"""
+Fonctions de traitement: extraction des circuits du PDF, correspondance avec la liste
+de fils Excel et ajout des annotations. Module sans dépendance à l'interface graphique.
+"""
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import Metrics
+from patterns import get_grammar
+from placement import LabelPlacer
+from startup import lazy_import
+
+# Chargés au premier usage (démarrage rapide de l'interface, voir startup.py)
+fitz = lazy_import("fitz")  # PyMuPDF
+pd = lazy_import("pandas")
+
+# Annotation des circuits absents de la liste de fils
+NOT_FOUND = "Non trouvé"
+
+class PageInfo:
+    """
+    Métadonnées d'une page, stockées une seule fois et partagées par tous ses circuits
+    """
+    __slots__ = ('page_num', 'rotation', 'page_width', 'page_height', 'part_numbers')
+    
+    def __init__(self, page_num, rotation, page_width, page_height, part_numbers):
+        self.page_num = page_num
+        self.rotation = rotation
+        self.page_width = page_width
+        self.page_height = page_height
+        self.part_numbers = part_numbers
+
+class CircuitRecord:
+    """
+    Circuit trouvé sur une page (une instance par occurrence, sans dict par objet)
+    
+    Reste utilisable comme le dict d'origine: record['rect'], record.get('sn_group', ''),
+    record['sn_fils_simple'] = ..., dict(record). Les clés de page (page_num, rotation,
+    page_width, page_height, part_numbers) sont lues dans le PageInfo partagé.
+    """
+    __slots__ = ('page', 'circuit_number', 'match_text', 'rect', 'is_left_side', 'sn_fils_simple', 'sn_group')
+    
+    KEYS = ('page_num', 'circuit_number', 'match_text', 'rect', 'rotation', 'is_left_side',
+            'page_width', 'page_height', 'part_numbers', 'sn_fils_simple', 'sn_group')
+    PAGE_KEYS = frozenset(PageInfo.__slots__)
+    FIELDS = frozenset(__slots__) - {'page'}
+    
+    def __init__(self, page, circuit_number, match_text, rect, is_left_side):
+        self.page = page
+        self.circuit_number = circuit_number
+        self.match_text = match_text
+        self.rect = tuple(rect)  # (x0, y0, x1, y1), plus compact qu'un fitz.Rect
+        self.is_left_side = is_left_side
+    
+    def __getitem__(self, key):
+        if key in self.PAGE_KEYS:
+            return getattr(self.page, key)
+        if key == 'rect':
+            return fitz.Rect(self.rect)
+        if key in self.FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:  # sn_fils_simple / sn_group pas encore renseignés
+                pass
+        raise KeyError(key)
+    
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, tuple(value) if key == 'rect' else value)
+    
+    def __contains__(self, key):
+        return key in self.PAGE_KEYS or (key in self.FIELDS and hasattr(self, key))
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def keys(self):
+        return [key for key in self.KEYS if key in self]
+    
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+    
+    def to_dict(self):
+        return dict(self.items())
+    
+    def __eq__(self, other):
+        if isinstance(other, (CircuitRecord, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"CircuitRecord({self.to_dict()!r})"
+
+# Fonctions de traitement (reprises du code original)
+def _build_text_index(textpage):
+    """
+    Reconstruire le texte d'une page avec, pour chaque caractère, sa boîte englobante
+    
+    Chaque ligne se termine par "\n" (sans boîte associée): pour un textpage créé avec
+    les options de page.get_text() (voir page_text_index), le texte produit est identique
+    à celui de page.get_text(). Une correspondance regex [début, fin) se localise donc
+    directement dans char_boxes, sans nouvelle recherche sur la page.
+    """
+    chars = []
+    char_boxes = []
+    for block in textpage.extractRAWDICT()['blocks']:
+        if block['type'] != 0:  # Ignorer les blocs image
+            continue
+        for line in block['lines']:
+            for span in line['spans']:
+                for char in span['chars']:
+                    chars.append(char['c'])
+                    char_boxes.append(char['bbox'])
+            chars.append("\n")
+            char_boxes.append(None)
+    return "".join(chars), char_boxes
+
+def page_text_index(page):
+    """Texte de la page (identique à page.get_text()) et boîte englobante de chaque caractère"""
+    return _build_text_index(page.get_textpage(flags=fitz.TEXTFLAGS_TEXT))
+
+def _span_rect(char_boxes, start, end):
+    """Boîte englobante des caractères [start, end) d'une correspondance"""
+    rect = None
+    for bbox in char_boxes[start:end]:
+        if bbox is None:
+            continue
+        if rect is None:
+            rect = fitz.Rect(bbox)
+        else:
+            rect |= bbox
+    return rect
+
+def extract_page(page, page_num, grammar=None, metrics=None):
+    """
+    Lire une page et retourner (candidats CircuitRecord, circuits à ignorer)
+    
+    Les candidats ne sont pas encore filtrés par les joints "J", qui peuvent se
+    trouver sur une autre page. Les motifs sont ceux de la grammaire (patterns.py),
+    par défaut celle du registre. Les durées get_text / search de la page sont
+    ajoutées à metrics.
+    """
+    if grammar is None:
+        grammar = get_grammar()
+    if metrics is None:
+        metrics = Metrics()
+    candidates = []
+    circuits_to_skip = set()  # Pour stocker les circuits à ignorer (associés à un J)
+    
+    # Une seule extraction du texte par page, avec la position de chaque caractère
+    start = time.perf_counter()
+    text, char_boxes = page_text_index(page)
+    metrics.add_time('get_text', time.perf_counter() - start, page_num)
+    search_start = time.perf_counter()
+    
+    # Obtenir les dimensions de la page
+    page_width = page.rect.width
+    page_height = page.rect.height
+    
+    # Métadonnées de la page, partagées par tous ses circuits (part numbers complétés pendant le parcours)
+    part_numbers = []
+    seen_part_numbers = set()
+    page_info = PageInfo(page_num, page.rotation, page_width, page_height, part_numbers)
+    
+    # Un seul parcours du texte pour les joints, les part numbers et les circuits
+    for kind, value, start, end in grammar.scan(text):
+        if kind == 'joint':
+            # Circuit associé à un joint J, à ignorer
+            circuits_to_skip.add(value)
+        elif kind == 'part_number':
+            # Numéro suivi d'une lettre majuscule, sans doublons (ordre d'apparition conservé)
+            if value not in seen_part_numbers:
+                seen_part_numbers.add(value)
+                part_numbers.append(value)
+        else:
+            # Circuit "7/W0007,COFLRYB-0.35,GY/W" ou "J+XXX": coordonnées de l'occurrence pour l'annotation
+            position = _span_rect(char_boxes, start, end)
+            
+            if position is not None:
+                x0, y0, x1, y1 = position
+                
+                # Déterminer si le circuit est sur la moitié gauche ou droite de la page
+                is_left_side = (x0 + x1) / 2 < page_width / 2
+                
+                candidates.append(CircuitRecord(page_info, value, text[start:end], position, is_left_side))
+    
+    metrics.add_time('search', time.perf_counter() - search_start, page_num)
+    metrics.count('pages')
+    metrics.count('candidates', len(candidates))
+    return candidates, circuits_to_skip
+
+def _extract_page_range(pdf_path, first_page=0, last_page=None, grammar=None, progress=None):
+    """
+    Lire les pages [first_page, last_page) et retourner (candidats, circuits à ignorer, mesures)
+    
+    Chaque appel ouvre son propre document, ce qui permet de l'exécuter dans un
+    processus séparé (progress n'est alors pas transmis).
+    """
+    candidates = []
+    circuits_to_skip = set()
+    metrics = Metrics()
+    
+    # Ouvrir le PDF avec PyMuPDF
+    doc = fitz.open(pdf_path)
+    if last_page is None:
+        last_page = len(doc)
+    
+    for page_num in range(first_page, last_page):
+        page_candidates, page_skips = extract_page(doc[page_num], page_num, grammar, metrics)
+        candidates.extend(page_candidates)
+        circuits_to_skip.update(page_skips)
+        if progress:
+            progress(page_num, last_page, len(page_candidates))
+    
+    doc.close()
+    return candidates, circuits_to_skip, metrics
+
+def extract_circuit_numbers(pdf_path, workers=1, grammar=None, metrics=None, progress=None):
+    """
+    Extraire tous les numéros de circuit du PDF
+    
+    Chaque page n'est lue qu'une seule fois: les joints "J" et les circuits candidats
+    sont collectés dans le même passage, puis filtrés à la fin (un joint peut se
+    trouver sur une page située après celle du circuit).
+    
+    Avec workers > 1, les pages sont réparties en tranches entre plusieurs processus
+    et les résultats sont fusionnés dans l'ordre des pages (résultat identique).
+    Les mesures des pages et les compteurs (circuits ignorés...) sont ajoutés à metrics.
+    progress(page_num, page_count, page_circuits) est appelé après chaque page lue (après
+    chaque tranche avec workers > 1, page_circuits étant alors le total de la tranche).
+    """
+    if grammar is None:
+        grammar = get_grammar()
+    if metrics is None:
+        metrics = Metrics()
+    if workers > 1:
+        doc = fitz.open(pdf_path)
+        page_count = len(doc)
+        doc.close()
+        
+        # Plusieurs tranches par processus pour équilibrer la charge entre pages denses et vides
+        chunk_size = max(1, -(-page_count // (workers * 4)))
+        first_pages = list(range(0, page_count, chunk_size))
+        last_pages = [min(first + chunk_size, page_count) for first in first_pages]
+        
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = executor.map(_extract_page_range, [pdf_path] * len(first_pages),
+                                  first_pages, last_pages, [grammar] * len(first_pages))
+            for last_page, result in zip(last_pages, chunks):
+                results.append(result)
+                if progress:
+                    progress(last_page - 1, page_count, len(result[0]))
+    else:
+        results = [_extract_page_range(pdf_path, grammar=grammar, progress=progress)]
+    
+    candidates = []
+    circuits_to_skip = set()
+    for chunk_candidates, chunk_skips, chunk_metrics in results:
+        candidates.extend(chunk_candidates)
+        circuits_to_skip.update(chunk_skips)
+        metrics.merge(chunk_metrics)
+    
+    # Filtrer les circuits associés à un joint, une fois toutes les pages lues
+    circuit_info = [entry for entry in candidates if entry['circuit_number'] not in circuits_to_skip]
+    metrics.count('joint_circuits', len(circuits_to_skip))
+    metrics.count('circuits_skipped', len(candidates) - len(circuit_info))
+    
+    return circuit_info
+
+def wire_list_columns(circuit_col, sn_col, grammar=None):
+    """
+    Filtre des colonnes utiles à la correspondance (noms nettoyés): circuit,
+    SN FILS SIMPLE, SN GROUP et colonnes part number (forme définie par la grammaire)
+    """
+    part_number_column = (grammar or get_grammar()).part_number_column
+    wanted = {circuit_col, sn_col, "SN GROUP"}
+    return lambda col: col in wanted or part_number_column.fullmatch(col) is not None
+
+def load_wire_list(excel_path, circuit_col='Numéro Circuit', sheet_name=None, columns=None):
+    """
+    Lire la liste de fils Excel et nettoyer les colonnes
+    
+    columns (voir wire_list_columns) limite la lecture aux colonnes utiles.
+    """
+    # Ouvrir le classeur une seule fois, pour la liste des feuilles comme pour la lecture
+    with pd.ExcelFile(excel_path) as xls:
+        if not xls.sheet_names:
+            raise ValueError("Le fichier Excel ne contient aucune feuille")
+        
+        if sheet_name is None:
+            # Utiliser la première feuille si sheet_name est None
+            sheet_name = xls.sheet_names[0]
+            print(f"Utilisation de la première feuille: '{sheet_name}'")
+        elif isinstance(sheet_name, str) and sheet_name not in xls.sheet_names:
+            raise ValueError(f"Feuille '{sheet_name}' non trouvée. Feuilles disponibles: {', '.join(xls.sheet_names)}")
+        
+        usecols = None
+        if columns is not None:
+            usecols = lambda col: columns(str(col).split(':')[0])
+        df = xls.parse(sheet_name, usecols=usecols)
+    
+    # Nettoyer les noms de colonnes (enlever tout ce qui suit ":")
+    df.columns = [str(col).split(':')[0] for col in df.columns]
+    
+    # Convertir la colonne de numéro de circuit en type numérique si nécessaire
+    if circuit_col in df.columns and df[circuit_col].dtype != 'int64':
+        df[circuit_col] = pd.to_numeric(df[circuit_col], errors='coerce')
+    
+    return df
+
+class WireListIndex:
+    """
+    Index de la liste de fils, construit une seule fois par fichier Excel
+    
+    - rows_by_circuit: numéro de circuit -> positions des lignes (dans l'ordre du fichier)
+    - flagged_rows(col): positions des lignes marquées "1" dans une colonne part number
+    """
+    def __init__(self, df, circuit_col, sn_col):
+        self.df = df
+        self.sn_col = sn_col
+        self.has_sn_group = "SN GROUP" in df.columns
+        self.columns = set(df.columns)
+        
+        self.rows_by_circuit = {}
+        for position, value in enumerate(df[circuit_col].tolist()):
+            if pd.isna(value):
+                continue
+            self.rows_by_circuit.setdefault(value, []).append(position)
+        
+        self._flagged = {}  # Colonne part number -> ensemble des lignes marquées "1"
+        self._values = {}  # Position -> (SN FILS SIMPLE, SN GROUP) déjà lus
+    
+    def flagged_rows(self, col):
+        """Positions des lignes contenant la valeur "1" dans la colonne part number"""
+        if col not in self._flagged:
+            mask = self.df[col].astype(str).isin(["1", "1.0"])
+            self._flagged[col] = set(mask.to_numpy().nonzero()[0].tolist())
+        return self._flagged[col]
+    
+    def find_row(self, circuit_num, part_numbers):
+        """
+        Position de la ligne correspondant au circuit, ou None
+        
+        Priorité: une ligne marquée "1" pour un des part numbers de la page,
+        sinon la première ligne du circuit.
+        """
+        rows = self.rows_by_circuit.get(circuit_num)
+        if not rows:
+            return None
+        
+        # Vérifier si les part numbers de la page existent dans les colonnes de l'Excel
+        matching_columns = [col for col in set(part_numbers) if col in self.columns]
+        if matching_columns:
+            flagged = [self.flagged_rows(col) for col in matching_columns]
+            for position in rows:
+                if any(position in rows_set for rows_set in flagged):
+                    return position
+        return rows[0]
+    
+    def row_values(self, position):
+        """Valeurs (SN FILS SIMPLE, SN GROUP ou None) de la ligne, converties en texte"""
+        if position not in self._values:
+            row = self.df.iloc[position]
+            sn_group = str(row["SN GROUP"]) if self.has_sn_group else None
+            self._values[position] = (str(row[self.sn_col]), sn_group)
+        return self._values[position]
+    
+    def match(self, circuit_info):
+        """Ajouter 'sn_fils_simple' et 'sn_group' à chaque circuit de circuit_info"""
+        # Pour chaque circuit, chercher les correspondances dans Excel
+        for entry in circuit_info:
+            try:
+                circuit_num = int(entry['circuit_number'])
+                part_numbers = entry.get('part_numbers', [])
+                
+                position = self.find_row(circuit_num, part_numbers)
+                if position is not None:
+                    sn_fils, sn_group = self.row_values(position)
+                    entry['sn_fils_simple'] = sn_fils
+                    # Ajouter SN GROUP si disponible
+                    if sn_group is not None:
+                        entry['sn_group'] = sn_group
+                else:
+                    entry['sn_fils_simple'] = NOT_FOUND
+                    entry['sn_group'] = ""
+            except (ValueError, TypeError):
+                # Si le circuit_number n'est pas convertible en entier
+                entry['sn_fils_simple'] = "Erreur de format"
+                entry['sn_group'] = ""
+        
+        return circuit_info
+
+def _to_int_or_none(value):
+    """Numéro de circuit converti par int(), ou None s'il n'est pas convertible"""
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+def _match_batch(circuit_info, df, circuit_col, sn_col):
+    """
+    Correspondance de tous les circuits en une fois, par fusions de DataFrames
+    
+    Même priorité que WireListIndex.find_row: ligne marquée "1" pour un part number
+    de la page, sinon première ligne du circuit, sinon "Non trouvé". Les numéros de
+    circuit non entiers donnent "Erreur de format".
+    """
+    if not circuit_info:
+        return circuit_info
+    
+    # Circuits à traiter, regroupés par ensemble de part numbers (un groupe par page en pratique)
+    circuit_numbers = pd.Series([entry['circuit_number'] for entry in circuit_info], dtype=object)
+    part_sets = pd.Series([tuple(entry.get('part_numbers', [])) for entry in circuit_info], dtype=object)
+    group_codes, groups = pd.factorize(part_sets)
+    
+    # Conversion par int(), comme WireListIndex.match (chiffres non ASCII, espaces, '_' acceptés)
+    circuit_ints = circuit_numbers.map(_to_int_or_none)
+    valid_format = circuit_ints.notna()
+    entries = pd.DataFrame({
+        'group': group_codes,
+        'circuit': pd.to_numeric(circuit_ints, errors='coerce').astype('float64'),
+    })
+    
+    row_circuits = pd.DataFrame({
+        'row': range(len(df)),
+        'circuit': pd.to_numeric(df[circuit_col], errors='coerce').astype('float64').to_numpy(),
+    }).dropna(subset=['circuit'])
+    
+    # Niveau 1: lignes marquées "1" dans une colonne part number de la page
+    columns = set(df.columns)
+    group_parts = pd.DataFrame(
+        [(code, part) for code, parts in enumerate(groups) for part in set(parts) if part in columns],
+        columns=['group', 'part'],
+    )
+    if not group_parts.empty:
+        part_columns = list(group_parts['part'].unique())
+        flags = df[part_columns].astype(str).isin(["1", "1.0"]).reset_index(drop=True)
+        flags.index.name = 'row'
+        flagged = flags.stack()
+        flagged = flagged[flagged].index.to_frame(index=False, name=['row', 'part'])
+        
+        part_matches = (
+            group_parts.merge(flagged, on='part')
+            .merge(row_circuits, on='row')
+            .groupby(['group', 'circuit'], as_index=False)['row'].min()
+        )
+        entries = entries.merge(part_matches, on=['group', 'circuit'], how='left')
+    else:
+        entries['row'] = float('nan')
+    
+    # Niveau 2: première ligne du circuit
+    first_rows = row_circuits.drop_duplicates('circuit').set_index('circuit')['row']
+    entries['row'] = entries['row'].fillna(entries['circuit'].map(first_rows))
+    
+    # Valeurs des lignes trouvées, converties en texte comme avec df.iloc[ligne][colonne]
+    found = entries['row'].notna().to_numpy()
+    positions = entries.loc[found, 'row'].astype('int64').to_numpy()
+    values = df.iloc[positions].to_numpy()
+    sn_values = iter(values[:, df.columns.get_loc(sn_col)].astype(str).tolist())
+    has_sn_group = "SN GROUP" in df.columns
+    if has_sn_group:
+        group_values = iter(values[:, df.columns.get_loc("SN GROUP")].astype(str).tolist())
+    
+    for entry, is_found, is_valid in zip(circuit_info, found, valid_format.to_numpy()):
+        if is_found:
+            entry['sn_fils_simple'] = next(sn_values)
+            if has_sn_group:
+                entry['sn_group'] = next(group_values)
+        elif is_valid:
+            entry['sn_fils_simple'] = NOT_FOUND
+            entry['sn_group'] = ""
+        else:
+            entry['sn_fils_simple'] = "Erreur de format"
+            entry['sn_group'] = ""
+    
+    return circuit_info
+
+def match_with_excel(circuit_info, excel_path, circuit_col='Numéro Circuit', sn_col='SN FILS SIMPLE', sheet_name=None, batch=False):
+    """
+    Correspondre les numéros de circuit avec le fichier Excel, en utilisant les part numbers si disponibles
+    
+    batch=True traite tous les circuits par fusions de DataFrames (gros volumes)
+    au lieu d'interroger l'index circuit par circuit.
+    """
+    df = load_wire_list(excel_path, circuit_col, sheet_name=sheet_name)
+    return match_with_wire_list(circuit_info, df, circuit_col, sn_col, batch=batch)
+
+def match_with_wire_list(circuit_info, df, circuit_col='Numéro Circuit', sn_col='SN FILS SIMPLE', batch=False, metrics=None):
+    """
+    Correspondre les numéros de circuit avec une liste de fils déjà chargée (load_wire_list)
+    """
+    if metrics is None:
+        metrics = Metrics()
+    with metrics.timer('matching'):
+        if batch:
+            matched_info = _match_batch(circuit_info, df, circuit_col, sn_col)
+        else:
+            # Compiler l'index une seule fois au lieu de parcourir le DataFrame pour chaque circuit
+            matched_info = WireListIndex(df, circuit_col, sn_col).match(circuit_info)
+    count_matches(metrics, matched_info)
+    return matched_info
+
+def count_matches(metrics, matched_info):
+    """Compter les correspondances trouvées, absentes et les erreurs de format"""
+    results = [entry['sn_fils_simple'] for entry in matched_info]
+    not_found = results.count(NOT_FOUND)
+    format_errors = results.count("Erreur de format")
+    metrics.count('matches_found', len(results) - not_found - format_errors)
+    metrics.count('matches_not_found', not_found)
+    metrics.count('format_errors', format_errors)
+
+def record_not_found(metrics, annotations):
+    """
+    Ajouter au rapport (metrics.extra['not_found']) la page et la position de chaque
+    circuit "Non trouvé" annoté, pour y accéder depuis l'aperçu
+
+    Positions: rectangle du numéro de circuit, dans la page non tournée (extraction).
+    """
+    metrics.extra.setdefault('not_found', []).extend(
+        {'page': entry['page_num'], 'circuit': entry['circuit_number'], 'rect': [round(value, 2) for value in entry['rect']]}
+        for entry in annotations if entry['sn_fils_simple'] == NOT_FOUND
+    )
+
+def _annotate_page(page, page_annotations, avoid_overlaps=True, metrics=None):
+    """
+    Écrire les annotations d'une page, positionnées selon le côté du circuit et la rotation
+
+    Toutes les annotations de la page passent par une même Shape, validée une seule fois:
+    un seul ajout au contenu de la page et une seule ressource de police (helv), au lieu
+    d'un flux et d'une recherche de police par page.insert_text.
+    Avec avoid_overlaps, une annotation qui recouvrirait du texte, un tracé ou une autre
+    annotation est déplacée vers la position libre la plus proche (voir placement.py).
+    """
+    if not page_annotations:
+        return
+    if metrics is None:
+        metrics = Metrics()
+    page_rotation = page.rotation
+    shape = page.new_shape()
+    if avoid_overlaps:
+        with metrics.timer('placement', page.number):
+            placer = LabelPlacer(page, fontsize=10)
+    
+    for ann in page_annotations:
+        circuit_num = ann['circuit_number']
+        sn_fils = ann['sn_fils_simple']
+        sn_group = ann.get('sn_group', '')
+        rect = ann['rect']
+        is_left_side = ann['is_left_side']
+        
+        # Calculer la position de l'annotation
+        x0, y0, x1, y1 = rect
+        
+        # Préparer le texte à ajouter
+        if sn_group:
+            annotation_text = f"{sn_fils}"#f"{sn_fils} ({sn_group})"
+        else:
+            annotation_text = f"{sn_fils}"
+        
+        # Déterminer la position en fonction de la position du circuit et de la rotation
+        if page_rotation == 0:
+            if is_left_side:
+                text_point = fitz.Point(x0 - 90, y0 + (y1 - y0)/2)
+            else:
+                text_point = fitz.Point(x1 + 90, y0 + (y1 - y0)/2)
+        
+        elif page_rotation == 90:
+            if is_left_side:
+                text_point = fitz.Point(x0 + (x1 - x0)/2 + 50, y0 - 10)
+            else:
+                text_point = fitz.Point(x0 + (x1 - x0)/2 + 50, y1 + 10)
+        
+        elif page_rotation == 180:
+            if is_left_side:
+                text_point = fitz.Point(x1 + 110, y0 + (y1 - y0)/2)
+            else:
+                text_point = fitz.Point(x0 - 110, y0 + (y1 - y0)/2)
+        
+        elif page_rotation == 270:
+            if is_left_side:
+                text_point = fitz.Point(x0 + (x1 - x0)/2, y1 + 90)
+            else:
+                text_point = fitz.Point(x0 + (x1 - x0)/2, y0 - 90)
+        
+        if avoid_overlaps:
+            text_point = placer.place(text_point, annotation_text, page_rotation)
+        
+        # Ajouter l'annotation (texte en rouge), mêmes opérateurs que page.insert_text
+        shape.insert_text(
+            text_point,
+            annotation_text,
+            fontsize=10,
+            color=(1, 0, 0),  # Rouge (R,G,B)
+            rotate=page_rotation
+        )
+
+    shape.commit()
+    if avoid_overlaps:
+        metrics.count('labels_moved', placer.moved)
+        metrics.count('labels_overlapping', placer.unresolved)
+
+# Modes d'enregistrement du PDF annoté
+SAVE_DEFAULT = "default"            # Réécriture simple (comportement d'origine)
+SAVE_INCREMENTAL = "incremental"    # Ajout des seules modifications à la fin du fichier
+SAVE_COMPACT = "compact"            # Réécriture complète compressée, pour la diffusion
+SAVE_MODES = (SAVE_DEFAULT, SAVE_INCREMENTAL, SAVE_COMPACT)
+
+# Options de doc.save() des réécritures complètes
+SAVE_OPTIONS = {
+    SAVE_DEFAULT: {},
+    SAVE_COMPACT: {
+        # Retirer les objets inutilisés et renuméroter (garbage=3, fusion des doublons, coûte
+        # plusieurs secondes sur les gros plans pour un gain de taille négligeable)
+        'garbage': 2,
+        'deflate': True,        # Compresser les flux (contenu des pages)
+        'deflate_images': True,
+        'deflate_fonts': True,
+        'use_objstms': 1,       # Regrouper les petits objets dans des flux d'objets compressés
+    },
+}
+
+def _working_copy_path(output_path):
+    """Copie de travail du mode incrémental, à côté de output_path"""
+    return output_path + ".incr.tmp"
+
+def open_output_document(pdf_path, output_path, save_mode=SAVE_DEFAULT):
+    """
+    Ouvrir le document à annoter
+    
+    En mode incrémental, le PDF source est d'abord copié tel quel dans une copie de travail
+    à côté de output_path (sauf s'il s'agit du même fichier): les annotations seront
+    ajoutées à la fin de cette copie par save_output_document, qui ne remplace output_path
+    qu'une fois l'enregistrement réussi. Un traitement interrompu (erreur, annulation)
+    doit fermer le document avec discard_output_document: output_path reste inchangé.
+    """
+    if save_mode not in SAVE_MODES:
+        raise ValueError(f"Mode d'enregistrement inconnu: {save_mode}. Modes disponibles: {', '.join(SAVE_MODES)}")
+    if save_mode == SAVE_INCREMENTAL and os.path.abspath(pdf_path) != os.path.abspath(output_path):
+        working_path = _working_copy_path(output_path)
+        shutil.copyfile(pdf_path, working_path)
+        return fitz.open(working_path)
+    return fitz.open(pdf_path)
+
+def discard_output_document(doc, output_path):
+    """Fermer sans l'enregistrer un document ouvert par open_output_document (copie de travail supprimée)"""
+    working_path = _working_copy_path(output_path)
+    is_working_copy = os.path.abspath(doc.name) == os.path.abspath(working_path)
+    doc.close()
+    if is_working_copy and os.path.exists(working_path):
+        os.remove(working_path)
+
+def save_output_document(doc, output_path, save_mode=SAVE_DEFAULT, **options):
+    """
+    Enregistrer le document annoté dans output_path et le fermer
+    
+    - incrémental: doc.saveIncr() si le document a été ouvert depuis output_path et
+      s'y prête (sinon réécriture complète);
+    - compact: garbage=2, deflate et flux d'objets;
+    - défaut: doc.save() avec options (ex. garbage=1).
+    Un document ouvert depuis output_path ou sa copie de travail (voir
+    open_output_document) et réécrit complètement est enregistré à côté puis remplace
+    le fichier; la copie de travail est supprimée en cas d'échec.
+    """
+    working_path = _working_copy_path(output_path)
+    working_copy = os.path.abspath(doc.name) == os.path.abspath(working_path)
+    in_place = working_copy or os.path.abspath(doc.name) == os.path.abspath(output_path)
+    try:
+        if save_mode == SAVE_INCREMENTAL and in_place and doc.can_save_incrementally():
+            doc.saveIncr()
+            doc.close()
+            if working_copy:
+                os.replace(working_path, output_path)
+            return
+        
+        save_options = dict(options, **SAVE_OPTIONS.get(save_mode, {}))
+        if in_place:
+            temp_path = output_path + ".tmp"
+            doc.save(temp_path, **save_options)
+            doc.close()
+            os.replace(temp_path, output_path)
+        else:
+            doc.save(output_path, **save_options)
+            doc.close()
+    finally:
+        if working_copy and os.path.exists(working_path):
+            if not doc.is_closed:
+                doc.close()
+            os.remove(working_path)
+
+def add_annotations_to_pdf(pdf_path, output_path, annotations, previous_output=None, changed_pages=None, metrics=None,
+                           save_mode=SAVE_DEFAULT, progress=None, avoid_overlaps=True):
+    """
+    Ajouter des annotations au PDF existant avec positionnement adapté
+    
+    Avec previous_output (résultat d'un traitement précédent du même PDF), ce résultat
+    sert de base: seules les pages de changed_pages sont recopiées depuis le PDF
+    source puis annotées, les autres pages sont conservées telles quelles.
+    save_mode choisit l'enregistrement (SAVE_DEFAULT, SAVE_INCREMENTAL ou SAVE_COMPACT).
+    progress(page_num, page_count, page_circuits) est appelé après chaque page refaite.
+    avoid_overlaps=False garde les décalages fixes d'origine (voir _annotate_page).
+    """
+    if metrics is None:
+        metrics = Metrics()
+    # Toutes les annotations du PDF (aussi celles des pages conservées de previous_output)
+    record_not_found(metrics, annotations)
+    
+    # Grouper les annotations par page
+    annotations_by_page = {}
+    for ann in annotations:
+        page_num = ann['page_num']
+        if page_num not in annotations_by_page:
+            annotations_by_page[page_num] = []
+        annotations_by_page[page_num].append(ann)
+    
+    # Ouvrir le PDF
+    doc = open_output_document(previous_output or pdf_path, output_path, save_mode)
+    try:
+        if previous_output:
+            source = fitz.open(pdf_path)
+            for page_num in sorted(changed_pages):
+                doc.delete_page(page_num)
+                doc.insert_pdf(source, from_page=page_num, to_page=page_num, start_at=page_num)
+            source.close()
+        else:
+            changed_pages = range(len(doc))
+        
+        # Parcourir chaque page et ajouter les annotations
+        page_count = len(doc)
+        for page_num in sorted(changed_pages):
+            page_annotations = annotations_by_page.get(page_num, [])
+            if page_annotations:
+                with metrics.timer('insert_text', page_num):
+                    _annotate_page(doc[page_num], page_annotations, avoid_overlaps, metrics)
+                metrics.count('annotations', len(page_annotations))
+            if progress:
+                progress(page_num, page_count, len(page_annotations))
+    except BaseException:
+        # Traitement interrompu (erreur, annulation): output_path n'est pas modifié
+        discard_output_document(doc, output_path)
+        raise
+    
+    # Enregistrer le PDF modifié (garbage=1 retire les objets des pages remplacées)
+    with metrics.timer('save'):
+        save_output_document(doc, output_path, save_mode, **({'garbage': 1} if previous_output else {}))
+    
+    return True
+
+def process_pdf(pdf_path, output_path, wire_list, circuit_col='Numéro Circuit', sn_col='SN FILS SIMPLE', workers=1, batch=False,
+                grammar=None, metrics=None, save_mode=SAVE_DEFAULT, avoid_overlaps=True):
+    """
+    Traiter un PDF complet (extraction, correspondance, annotations) et retourner un résumé
+    
+    wire_list est le DataFrame retourné par load_wire_list, chargé une seule fois
+    pour tous les PDF d'un lot. Les mesures détaillées sont ajoutées au résumé ('metrics').
+    """
+    if metrics is None:
+        metrics = Metrics()
+    
+    with metrics.timer('extraction'):
+        circuit_info = extract_circuit_numbers(pdf_path, workers=workers, grammar=grammar, metrics=metrics)
+    
+    matched_info = match_with_wire_list(circuit_info, wire_list, circuit_col, sn_col, batch=batch, metrics=metrics)
+    
+    with metrics.timer('annotation'):
+        add_annotations_to_pdf(pdf_path, output_path, matched_info, metrics=metrics, save_mode=save_mode,
+                               avoid_overlaps=avoid_overlaps)
+    
+    summary = build_summary(pdf_path, output_path, matched_info, metrics.timings())
+    summary['metrics'] = metrics.to_dict()
+    return summary
+
+def iter_page_circuits(doc, grammar=None, metrics=None):
+    """
+    Générateur des circuits d'un document ouvert, page par page:
+    (numéro de page, candidats, circuits à ignorer)
+    """
+    if grammar is None:
+        grammar = get_grammar()
+    for page_num in range(len(doc)):
+        candidates, circuits_to_skip = extract_page(doc[page_num], page_num, grammar, metrics)
+        yield page_num, candidates, circuits_to_skip
+
+def _scan_joint_circuits(doc, grammar):
+    """
+    Circuits associés à un joint "J" dans tout le document (texte brut, sans positions)
+    """
+    circuits_to_skip = set()
+    for page in doc:
+        circuits_to_skip.update(grammar.joint_circuits(page.get_text()))
+    return circuits_to_skip
+
+def process_pdf_streaming(pdf_path, output_path, wire_list, circuit_col='Numéro Circuit', sn_col='SN FILS SIMPLE', progress=None,
+                          grammar=None, metrics=None, save_mode=SAVE_DEFAULT, avoid_overlaps=True):
+    """
+    Traiter le PDF page par page (extraction -> correspondance -> annotation) dans un seul
+    document ouvert, et retourner un résumé
+    
+    Seuls les circuits de la page en cours sont gardés en mémoire. Comme un joint "J" peut
+    se trouver sur une page postérieure à celle de son circuit, les joints sont d'abord
+    relevés sur le texte brut de toutes les pages (lecture rapide, sans positions).
+    progress(page_num, page_count, page_circuits) est appelé après chaque page.
+    """
+    if grammar is None:
+        grammar = get_grammar()
+    if metrics is None:
+        metrics = Metrics()
+    index = WireListIndex(wire_list, circuit_col, sn_col)
+    circuits = not_found = format_errors = annotated_pages = 0
+    
+    doc = open_output_document(pdf_path, output_path, save_mode)
+    try:
+        page_count = len(doc)
+        
+        with metrics.timer('extraction'), metrics.timer('joint_scan'):
+            circuits_to_skip = _scan_joint_circuits(doc, grammar)
+        metrics.count('joint_circuits', len(circuits_to_skip))
+        
+        for page_num in range(page_count):
+            with metrics.timer('extraction'):
+                candidates, _ = extract_page(doc[page_num], page_num, grammar, metrics)
+            
+            with metrics.timer('matching'):
+                page_annotations = index.match([entry for entry in candidates
+                                                if entry['circuit_number'] not in circuits_to_skip])
+            metrics.count('circuits_skipped', len(candidates) - len(page_annotations))
+            count_matches(metrics, page_annotations)
+            
+            with metrics.timer('annotation'):
+                if page_annotations:
+                    with metrics.timer('insert_text', page_num):
+                        _annotate_page(doc[page_num], page_annotations, avoid_overlaps, metrics)
+                    metrics.count('annotations', len(page_annotations))
+                    record_not_found(metrics, page_annotations)
+                    results = [entry['sn_fils_simple'] for entry in page_annotations]
+                    circuits += len(results)
+                    not_found += results.count(NOT_FOUND)
+                    format_errors += results.count("Erreur de format")
+                    annotated_pages += 1
+            
+            if progress:
+                progress(page_num, page_count, len(page_annotations))
+    except BaseException:
+        # Traitement interrompu (erreur, annulation): output_path n'est pas modifié
+        discard_output_document(doc, output_path)
+        raise
+    
+    with metrics.timer('annotation'), metrics.timer('save'):
+        save_output_document(doc, output_path, save_mode)
+    
+    return {
+        'pdf': pdf_path,
+        'output': output_path,
+        'circuits': circuits,
+        'found': circuits - not_found - format_errors,
+        'not_found': not_found,
+        'format_errors': format_errors,
+        'annotated_pages': annotated_pages,
+        'timings': metrics.timings(),
+        'metrics': metrics.to_dict(),
+    }
+
+def build_summary(pdf_path, output_path, matched_info, timings):
+    """Résumé d'un traitement: nombre de circuits, correspondances et durées par étape"""
+    results = [entry['sn_fils_simple'] for entry in matched_info]
+    not_found = results.count(NOT_FOUND)
+    format_errors = results.count("Erreur de format")
+    
+    return {
+        'pdf': pdf_path,
+        'output': output_path,
+        'circuits': len(matched_info),
+        'found': len(matched_info) - not_found - format_errors,
+        'not_found': not_found,
+        'format_errors': format_errors,
+        'annotated_pages': len({entry['page_num'] for entry in matched_info}),
+        'timings': timings,
+    }
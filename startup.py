@@ -0,0 +1,117 @@
+"""
+Démarrage rapide de l'application: imports différés des modules lourds et mesure du
+temps de démarrage
+
+pandas (et openpyxl), PyMuPDF et pyarrow représentent l'essentiel du temps d'import.
+Les modules qui les utilisent les déclarent avec lazy_import(): le module n'est
+réellement chargé qu'au premier accès à l'un de ses attributs (fitz.open, pd.DataFrame...).
+L'interface, qui ne fait que transmettre les traitements aux processus de travail
+(voir jobs.py), s'affiche ainsi sans les charger; les processus de travail les chargent
+(preload) dès leur démarrage, lancé une fois la fenêtre affichée.
+
+Mesure: python App.py --startup-report (durée jusqu'à l'affichage de la fenêtre, modules
+lourds chargés et imports les plus longs, d'après python -X importtime).
+"""
+import importlib
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+
+# Modules lourds utilisés par le traitement, chargés par les processus de travail
+HEAVY_MODULES = ('fitz', 'pandas', 'openpyxl')
+
+# Dossier des modules de l'application (import mesuré depuis ce dossier)
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Ligne de python -X importtime: "import time: self [us] | cumulative | package"
+_IMPORT_TIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def lazy_import(name):
+    """
+    Module chargé au premier accès à l'un de ses attributs (importlib.util.LazyLoader)
+
+    Ne pas partager un module pas encore chargé entre plusieurs threads (chargement non
+    protégé avant Python 3.12): le premier accès doit avoir lieu dans un seul thread.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def preload(names=HEAVY_MODULES):
+    """Charger les modules lourds (processus de travail), en ignorant ceux qui manquent"""
+    for name in names:
+        try:
+            # L'accès à un attribut termine le chargement d'un module différé
+            getattr(importlib.import_module(name), '__name__')
+        except ImportError:
+            pass
+
+
+def loaded_heavy_modules(names=HEAVY_MODULES):
+    """Modules lourds réellement chargés dans ce processus (les modules différés non touchés sont exclus)"""
+    loaded = []
+    for name in names:
+        module = sys.modules.get(name)
+        if module is not None and not isinstance(module, importlib.util._LazyModule):
+            loaded.append(name)
+    return loaded
+
+
+def import_times(module, top=15):
+    """
+    Imports les plus longs de module, mesurés dans un nouvel interpréteur (-X importtime)
+    lancé depuis le dossier de l'application
+
+    Retourne (durée totale en secondes, liste de (module, durée cumulée en secondes)).
+    Lève RuntimeError si l'import échoue.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=APP_DIR)
+    if result.returncode != 0:
+        # Dernière ligne de l'erreur (ex. ModuleNotFoundError), sans les lignes de -X importtime
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Import de {module} impossible: {errors[-1] if errors else result.returncode}")
+    entries = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative = int(match.group(2)) / 1e6
+        entries.append((match.group(4), cumulative))
+        if match.group(4) == module:
+            total = cumulative
+    # Modules de premier niveau seulement (un paquet et ses sous-modules comptent une fois)
+    top_level = {}
+    for name, seconds in entries:
+        root = name.split(".")[0]
+        top_level[root] = max(top_level.get(root, 0.0), seconds)
+    top_level.pop(module, None)
+    return total, sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def startup_report_lines(module, window_seconds):
+    """Rapport de démarrage: durée jusqu'à la fenêtre, modules lourds chargés, imports les plus longs"""
+    lines = [f"Fenêtre affichée en {window_seconds:.3f} s"]
+    loaded = loaded_heavy_modules()
+    lines.append("Modules lourds chargés au démarrage: " + (", ".join(loaded) if loaded else "aucun"))
+    try:
+        total, slowest = import_times(module)
+    except RuntimeError as e:
+        lines.append(str(e))
+        return lines
+    lines.append(f"Import de {module}: {total:.3f} s (nouvel interpréteur). Imports les plus longs:")
+    lines.extend(f"  {name}: {seconds:.3f} s" for name, seconds in slowest)
+    return lines